@@ -0,0 +1,89 @@
+"""
+Multi-threaded throughput of mixed read/write workloads on the sharded
+ConcurrentMountainManager, against a MountainManager behind a single lock.
+
+Usage: python -m benchmarks.bench_concurrent_manager [threads ...]
+"""
+import random
+import sys
+import threading
+import time
+
+from mountain import Mountain
+from mountain_manager import MountainManager
+from concurrent_mountain_manager import ConcurrentMountainManager
+from benchmarks.trail_gen import generate_mountains
+
+OPS_PER_THREAD = 2000
+DIFFICULTIES = 64
+
+
+class LockedMountainManager:
+    """A MountainManager behind one global lock, as the baseline."""
+
+    def __init__(self) -> None:
+        self.manager = MountainManager()
+        self.lock = threading.Lock()
+
+    def add_mountains(self, mountains):
+        with self.lock:
+            self.manager.add_mountains(mountains)
+
+    def add_mountain(self, mountain):
+        with self.lock:
+            self.manager.add_mountain(mountain)
+
+    def remove_mountain(self, mountain):
+        with self.lock:
+            self.manager.remove_mountain(mountain)
+
+    def mountains_with_difficulty(self, diff):
+        with self.lock:
+            return self.manager.mountains_with_difficulty(diff)
+
+    def group_by_difficulty(self):
+        with self.lock:
+            return self.manager.group_by_difficulty()
+
+
+def worker(manager, seed, write_ratio, group_ratio):
+    rng = random.Random(seed)
+    mine = []
+    for i in range(OPS_PER_THREAD):
+        r = rng.random()
+        if r < write_ratio:
+            if mine and rng.random() < 0.5:
+                manager.remove_mountain(mine.pop())
+            else:
+                mountain = Mountain(f"t{seed}-{i}", rng.randrange(DIFFICULTIES), i)
+                manager.add_mountain(mountain)
+                mine.append(mountain)
+        elif r < write_ratio + group_ratio:
+            manager.group_by_difficulty()
+        else:
+            manager.mountains_with_difficulty(rng.randrange(DIFFICULTIES))
+
+
+def run(make_manager, threads, write_ratio, group_ratio):
+    manager = make_manager()
+    manager.add_mountains(generate_mountains(5000, DIFFICULTIES - 1))
+    workers = [threading.Thread(target=worker, args=(manager, t, write_ratio, group_ratio)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return threads * OPS_PER_THREAD / (time.perf_counter() - start)
+
+
+def main(thread_counts):
+    print(f"{'threads':>7} {'writes':>6} {'groups':>6} {'locked ops/s':>13} {'sharded ops/s':>14}")
+    for threads in thread_counts:
+        for write_ratio, group_ratio in [(0.05, 0.01), (0.5, 0.01), (0.05, 0.1)]:
+            locked = run(LockedMountainManager, threads, write_ratio, group_ratio)
+            sharded = run(ConcurrentMountainManager, threads, write_ratio, group_ratio)
+            print(f"{threads:>7} {write_ratio:>6} {group_ratio:>6} {locked:>13.0f} {sharded:>14.0f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [1, 4, 8])
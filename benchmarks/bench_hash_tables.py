@@ -0,0 +1,68 @@
+"""
+Memory per entry and insert/lookup/overwrite throughput of LinearProbeTable,
+which stores one (key, value) tuple per slot, against ParallelProbeTable,
+which keeps keys, values and hashes in parallel arrays.
+
+Memory is measured with tracemalloc in a separate build from the timings, and
+excludes the keys and values themselves, which all layouts share.
+
+Usage: python -m benchmarks.bench_hash_tables [n_entries ...]
+"""
+import sys
+import time
+import tracemalloc
+
+from data_structures.hash_table import LinearProbeTable
+from data_structures.parallel_hash_table import ParallelProbeTable, np
+
+LAYOUTS = {
+    "tuples": LinearProbeTable,
+    "parallel": ParallelProbeTable,
+}
+if np is not None:
+    LAYOUTS["parallel+numpy"] = lambda: ParallelProbeTable(numpy_hashes=True)
+
+
+def build(make_table, keys, values):
+    table = make_table()
+    for key, value in zip(keys, values):
+        table[key] = value
+    return table
+
+
+def memory_per_entry(make_table, keys, values) -> float:
+    tracemalloc.start()
+    table = build(make_table, keys, values)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del table
+    return used / len(keys)
+
+
+def ops_per_second(make_table, keys, values) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    table = build(make_table, keys, values)
+    built = time.perf_counter()
+    for key in keys:
+        table[key]
+    looked_up = time.perf_counter()
+    for key, value in zip(keys, values):
+        table[key] = value
+    overwritten = time.perf_counter()
+    n = len(keys)
+    return n / (built - start), n / (looked_up - built), n / (overwritten - looked_up)
+
+
+def main(sizes):
+    print(f"{'entries':>9} {'layout':>15} {'bytes/entry':>12} {'inserts/s':>11} {'lookups/s':>11} {'overwrites/s':>13}")
+    for n in sizes:
+        keys = [f"mountain{i}" for i in range(n)]
+        values = list(range(n))
+        for name, make_table in LAYOUTS.items():
+            memory = memory_per_entry(make_table, keys, values)
+            inserts, lookups, overwrites = ops_per_second(make_table, keys, values)
+            print(f"{n:>9} {name:>15} {memory:>12.1f} {inserts:>11.0f} {lookups:>11.0f} {overwrites:>13.0f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
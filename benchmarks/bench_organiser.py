@@ -0,0 +1,62 @@
+"""
+Insert and rank throughput of MountainOrganiser against the original
+plain-list organiser using bisect.insort, to find the crossover point.
+ColumnarOrganiser ranks all queries with one bulk positions() call.
+
+Usage: python -m benchmarks.bench_organiser [n_mountains ...]
+"""
+import bisect
+import random
+import sys
+import time
+
+from mountain_organiser import MountainOrganiser, ColumnarOrganiser
+from benchmarks.trail_gen import generate_mountains
+
+GROUP_SIZE = 100
+
+
+class ListOrganiser:
+    """The original MountainOrganiser, backed by a plain sorted list."""
+
+    def __init__(self) -> None:
+        self.mountains = []
+
+    def cur_position(self, mountain):
+        pos = bisect.bisect_left(self.mountains, (mountain.length, mountain.name))
+        if pos != len(self.mountains) and self.mountains[pos] == (mountain.length, mountain.name):
+            return pos
+        raise KeyError("Mountain not found")
+
+    def add_mountains(self, mountains):
+        for mountain in mountains:
+            bisect.insort(self.mountains, (mountain.length, mountain.name))
+
+
+def run(make_organiser, mountains, queries):
+    organiser = make_organiser()
+    start = time.perf_counter()
+    for i in range(0, len(mountains), GROUP_SIZE):
+        organiser.add_mountains(mountains[i:i + GROUP_SIZE])
+    added = time.perf_counter()
+    if isinstance(organiser, ColumnarOrganiser):
+        organiser.positions(queries)
+    else:
+        for mountain in queries:
+            organiser.cur_position(mountain)
+    return added - start, time.perf_counter() - added
+
+
+def main(sizes):
+    print(f"{'mountains':>10} {'list add (s)':>13} {'blocked add (s)':>16} {'list rank (s)':>14} {'blocked rank (s)':>17} {'columnar add (s)':>17} {'columnar rank (s)':>18}")
+    for n in sizes:
+        mountains = generate_mountains(n, max_length=10 * n)
+        queries = random.Random(1).sample(mountains, min(n, 10_000))
+        list_add, list_rank = run(ListOrganiser, mountains, queries)
+        blocked_add, blocked_rank = run(MountainOrganiser, mountains, queries)
+        columnar_add, columnar_rank = run(ColumnarOrganiser, mountains, queries)
+        print(f"{n:>10} {list_add:>13.3f} {blocked_add:>16.3f} {list_rank:>14.3f} {blocked_rank:>17.3f} {columnar_add:>17.3f} {columnar_rank:>18.3f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [1_000, 10_000, 100_000, 300_000])
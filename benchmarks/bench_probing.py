@@ -0,0 +1,47 @@
+"""
+Probe statistics and insert/lookup/delete throughput of LinearProbeTable under
+each probing strategy, keyed by mountain names.
+
+Usage: python -m benchmarks.bench_probing [n_entries ...]
+"""
+import random
+import sys
+import time
+
+from data_structures.hash_table import LinearProbeTable
+from benchmarks.trail_gen import generate_mountains
+
+
+def run(probing, names, missing):
+    table = LinearProbeTable(probing=probing)
+    start = time.perf_counter()
+    for i, name in enumerate(names):
+        table[name] = i
+    inserted = time.perf_counter()
+    for name in names:
+        table[name]
+    for name in missing:
+        name in table
+    looked_up = time.perf_counter()
+    stats = table.probe_stats()
+    deleted_start = time.perf_counter()
+    for name in names[::2]:
+        del table[name]
+    deleted = time.perf_counter()
+    return stats, inserted - start, looked_up - inserted, deleted - deleted_start
+
+
+def main(sizes):
+    print(f"{'entries':>9} {'probing':>11} {'mean probe':>11} {'max probe':>10} {'largest cluster':>16} {'insert (s)':>11} {'lookup (s)':>11} {'delete (s)':>11}")
+    for n in sizes:
+        names = [mountain.name for mountain in generate_mountains(n)]
+        random.Random(2).shuffle(names)
+        missing = [f"{name}x" for name in names[:n // 2]]
+        for probing in LinearProbeTable.PROBING:
+            stats, insert, lookup, delete = run(probing, names, missing)
+            largest = max(stats["cluster_sizes"], default=0)
+            print(f"{n:>9} {probing:>11} {stats['mean_probe_length']:>11.2f} {stats['max_probe_length']:>10} {largest:>16} {insert:>11.3f} {lookup:>11.3f} {delete:>11.3f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,47 @@
+"""
+Resize pauses of the hash tables: the longest single insert while loading n
+keys, which is the insert that triggers the last resize, and the total time.
+
+Usage: python -m benchmarks.bench_resize [n_entries ...]
+"""
+import sys
+import time
+
+from data_structures.hash_table import LinearProbeTable
+from data_structures.parallel_hash_table import ParallelProbeTable
+from double_key_table import DoubleKeyTable
+
+TABLES = {
+    "LinearProbeTable": lambda: LinearProbeTable(),
+    "LinearProbeTable robin_hood": lambda: LinearProbeTable(probing="robin_hood"),
+    "ParallelProbeTable": lambda: ParallelProbeTable(),
+    # One pair per top-level key, so that the top level resizes.
+    "DoubleKeyTable": lambda: DoubleKeyTable(),
+}
+
+
+def longest_insert(table, keys) -> tuple[float, float]:
+    double = isinstance(table, DoubleKeyTable)
+    longest = 0.0
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        before = time.perf_counter()
+        if double:
+            table[key, key] = i
+        else:
+            table[key] = i
+        longest = max(longest, time.perf_counter() - before)
+    return longest, time.perf_counter() - start
+
+
+def main(sizes):
+    print(f"{'entries':>9} {'table':>28} {'longest insert (ms)':>20} {'total (s)':>10}")
+    for n in sizes:
+        keys = [f"mountain{i}" for i in range(n)]
+        for name, make_table in TABLES.items():
+            longest, total = longest_insert(make_table(), keys)
+            print(f"{n:>9} {name:>28} {longest * 1000:>20.1f} {total:>10.2f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [100_000, 500_000])
@@ -0,0 +1,30 @@
+"""
+Compare load time, save time and disk footprint of each store codec.
+
+Usage: python -m benchmarks.bench_store_codecs [n_mountains ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from serialize import CODECS, read_store, write_store
+from benchmarks.trail_gen import generate_trail
+
+def main(sizes):
+    extensions = [".json"] + list(CODECS)
+    print(f"{'mountains':>10} {'codec':>6} {'size (KiB)':>11} {'save (s)':>9} {'load (s)':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            trail = generate_trail(n)
+            for ext in extensions:
+                path = os.path.join(directory, "store" + (ext if ext == ".json" else ".json" + ext))
+                start = time.perf_counter()
+                write_store(trail, path)
+                saved = time.perf_counter()
+                read_store(path)
+                loaded = time.perf_counter()
+                print(f"{n:>10} {ext:>6} {os.path.getsize(path) / 1024:>11.1f} {saved - start:>9.3f} {loaded - saved:>9.3f}")
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,40 @@
+"""
+Generators for large random trails, used by the benchmarks.
+
+Trails are built as balanced splits of short series, so that the nesting
+depth stays logarithmic and the recursive (de)serializer can handle them.
+"""
+from __future__ import annotations
+
+import random
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+
+SERIES_LENGTH = 8
+
+def generate_mountains(n: int, max_difficulty: int = 10, max_length: int = 1000, seed: int = 0) -> list[Mountain]:
+    """Returns n random mountains with unique names."""
+    rng = random.Random(seed)
+    return [
+        Mountain(f"m{i}", rng.randint(0, max_difficulty), rng.randint(0, max_length))
+        for i in range(n)
+    ]
+
+def generate_trail(n: int, max_difficulty: int = 10, max_length: int = 1000, seed: int = 0) -> Trail:
+    """Returns a trail holding n random mountains."""
+    mountains = generate_mountains(n, max_difficulty, max_length, seed)
+    return _build(mountains, 0, len(mountains))
+
+def _build(mountains: list[Mountain], lo: int, hi: int) -> Trail:
+    if hi - lo <= SERIES_LENGTH:
+        trail = Trail(None)
+        for i in range(hi - 1, lo - 1, -1):
+            trail = Trail(TrailSeries(mountains[i], trail))
+        return trail
+    third = (hi - lo) // 3
+    return Trail(TrailSplit(
+        _build(mountains, lo, lo + third),
+        _build(mountains, lo + third, lo + 2 * third),
+        _build(mountains, lo + 2 * third, hi),
+    ))
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import heapq
+import threading
+
+from mountain import Mountain
+from mountain_manager import MountainManager
+
+
+class ReadWriteLock:
+    '''
+    A lock that can be held by many readers at once, or by a single writer.
+    Waiting writers take priority over new readers, so writers are never starved.
+    '''
+
+    def __init__(self) -> None:
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writing = False
+        self.writers_waiting = 0
+
+    def acquire_read(self):
+        with self.condition:
+            while self.writing or self.writers_waiting:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if self.readers == 0:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.writers_waiting += 1
+            while self.writing or self.readers:
+                self.condition.wait()
+            self.writers_waiting -= 1
+            self.writing = True
+
+    def release_write(self):
+        with self.condition:
+            self.writing = False
+            self.condition.notify_all()
+
+
+class ConcurrentMountainManager:
+    '''
+    A thread-safe MountainManager, sharded by difficulty.
+
+    Each shard is a MountainManager guarded by its own ReadWriteLock, and
+    holds the difficulties d with d % shards == its index. Readers never block
+    each other, and a writer only blocks the shards it touches. Queries spanning
+    several shards hold all of their read locks at once, so they see a
+    consistent state.
+
+    Attributes
+    ----------
+    shards: list[MountainManager]
+        The underlying managers.
+    locks: list[ReadWriteLock]
+        The lock guarding each shard.
+
+    Complexity
+    ----------
+    As MountainManager, plus O(S) locking for queries over all S shards.
+    '''
+
+    def __init__(self, shards = 16, **kwargs) -> None:
+        '''
+        Initializes the manager with the given number of shards.
+        Any other arguments are passed on to each shard's MountainManager.
+
+        Best Case Complexity: O(S)
+        Worst Case Complexity: O(S)
+        '''
+        self.shards = [MountainManager(**kwargs) for _ in range(shards)]
+        self.locks = [ReadWriteLock() for _ in range(shards)]
+
+    def shard_index(self, difficulty: int) -> int:
+        return difficulty % len(self.shards)
+
+    def _read_all(self):
+        for lock in self.locks:
+            lock.acquire_read()
+
+    def _release_all(self):
+        for lock in self.locks:
+            lock.release_read()
+
+    def add_mountain(self, mountain: Mountain):
+        '''
+        Add a mountain to the manager.
+
+        Complexity: See MountainManager.add_mountain.
+        '''
+        i = self.shard_index(mountain.difficulty_level)
+        self.locks[i].acquire_write()
+        try:
+            self.shards[i].add_mountain(mountain)
+        finally:
+            self.locks[i].release_write()
+
+    def add_mountains(self, mountains):
+        '''
+        Add many mountains to the manager at once, locking each shard once.
+
+        Complexity: See MountainManager.add_mountains.
+        '''
+        per_shard = [[] for _ in self.shards]
+        for mountain in mountains:
+            per_shard[self.shard_index(mountain.difficulty_level)].append(mountain)
+        for i, group in enumerate(per_shard):
+            if group:
+                self.locks[i].acquire_write()
+                try:
+                    self.shards[i].add_mountains(group)
+                finally:
+                    self.locks[i].release_write()
+
+    def remove_mountain(self, mountain: Mountain):
+        '''
+        Remove a mountain from the manager.
+
+        Complexity: See MountainManager.remove_mountain.
+        '''
+        i = self.shard_index(mountain.difficulty_level)
+        self.locks[i].acquire_write()
+        try:
+            self.shards[i].remove_mountain(mountain)
+        finally:
+            self.locks[i].release_write()
+
+    def on_trail_change(self, change):
+        '''
+        Apply a TrailChange published by the trail edit methods.
+
+        Complexity: See MountainManager.on_trail_change.
+        '''
+        if change.added:
+            self.add_mountains(change.added)
+        for mountain in change.removed:
+            self.remove_mountain(mountain)
+
+    def edit_mountain(self, old: Mountain, new: Mountain):
+        '''
+        Remove the old mountain and add the new mountain, atomically.
+        The shards involved are locked in index order to avoid deadlocks.
+
+        Complexity: See MountainManager.edit_mountain.
+        '''
+        i = self.shard_index(old.difficulty_level)
+        j = self.shard_index(new.difficulty_level)
+        for k in sorted({i, j}):
+            self.locks[k].acquire_write()
+        try:
+            old_shard = self.shards[i]
+            handle = old_shard.handles.get(id(new))
+            if handle is not None:
+                old_shard._remove_handle(new, *handle)
+            else:
+                old_shard.remove_mountain(old)
+            self.shards[j].add_mountain(new)
+        finally:
+            for k in sorted({i, j}):
+                self.locks[k].release_write()
+
+    def mountains_with_difficulty(self, diff: int):
+        '''
+        Return a list of all mountains with this difficulty.
+
+        Complexity: See MountainManager.mountains_with_difficulty.
+        '''
+        i = self.shard_index(diff)
+        self.locks[i].acquire_read()
+        try:
+            return self.shards[i].mountains_with_difficulty(diff)
+        finally:
+            self.locks[i].release_read()
+
+    def mountains_between(self, lo: int, hi: int):
+        '''
+        Return a list of all mountains with difficulty between lo and hi (inclusive),
+        in ascending order of difficulty.
+
+        Best Case Complexity: O(S log D + k) where k is the number of mountains returned
+        Worst Case Complexity: O(S log D + k log S)
+        '''
+        self._read_all()
+        try:
+            ranges = [shard.mountains_between(lo, hi) for shard in self.shards]
+        finally:
+            self._release_all()
+        return list(heapq.merge(*ranges, key=lambda m: m.difficulty_level))
+
+    def group_by_difficulty(self):
+        '''
+        Returns a list of lists of all mountains, grouped by and sorted by ascending difficulty.
+
+        Best Case Complexity: O(n + D log S)
+        Worst Case Complexity: O(n + D log S)
+        '''
+        self._read_all()
+        try:
+            groups = [shard.group_by_difficulty() for shard in self.shards]
+        finally:
+            self._release_all()
+        return list(heapq.merge(*groups, key=lambda group: group[0].difficulty_level))
@@ -0,0 +1,109 @@
+"""
+Convert, validate and re-serialize every store in a directory in parallel.
+Stores with an edit journal are loaded with their journaled edits applied,
+and converted to a single snapshot.
+
+Example: python convert_stores.py stores --to .json.gz --out converted
+         python convert_stores.py stores --check
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from journal import TrailJournal
+from serialize import CODECS, serialize
+
+STORE_EXTENSIONS = (".json",) + tuple(".json" + ext for ext in CODECS)
+
+
+def store_base(name: str) -> str:
+    """Strip the store extension (and any codec extension) from a file name."""
+    for ext in sorted(STORE_EXTENSIONS, key=len, reverse=True):
+        if name.endswith(ext):
+            return name[:-len(ext)]
+    return name
+
+
+def process_store(path: str, out_path: str | None, check: bool) -> dict:
+    """
+    Load the store at path, replaying its journal if it has one, optionally write it
+    to out_path and check that it round-trips.
+    Runs inside a worker process, so only returns plain data.
+    """
+    result = {"path": path, "size": os.path.getsize(path)}
+    start = time.perf_counter()
+    try:
+        journal = TrailJournal(path)
+        trail = journal.load()
+        result["load_s"] = time.perf_counter() - start
+        result["journal_records"] = journal.journal_length
+        expected = serialize(trail) if check else None
+        if out_path is not None:
+            start = time.perf_counter()
+            # Journaled edits are folded into the new snapshot, and any stale journal next to it is removed.
+            TrailJournal(out_path).compact(trail)
+            result["save_s"] = time.perf_counter() - start
+            result["out_path"] = out_path
+            result["out_size"] = os.path.getsize(out_path)
+        if check:
+            reloaded = TrailJournal(out_path if out_path is not None else path).load()
+            result["round_trip"] = serialize(reloaded) == expected
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def find_stores(directory: str) -> list[str]:
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(STORE_EXTENSIONS)
+    )
+
+
+def format_result(result: dict) -> str:
+    line = f"{result['path']}: {result['size']}B"
+    if "error" in result:
+        return line + f" ERROR {result['error']}"
+    line += f" load {result['load_s']:.3f}s"
+    if result.get("journal_records"):
+        line += f" (+{result['journal_records']} journaled edits)"
+    if "out_path" in result:
+        line += f" -> {result['out_path']}: {result['out_size']}B save {result['save_s']:.3f}s"
+    if "round_trip" in result:
+        line += " round-trip " + ("ok" if result["round_trip"] else "MISMATCH")
+    return line
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Convert and validate store files in parallel.")
+    p.add_argument("directory", help="Directory containing the store files.")
+    p.add_argument("--to", help="Store extension to convert to, e.g. .json or .json.xz.", choices=STORE_EXTENSIONS)
+    p.add_argument("--out", help="Output directory for converted stores. Defaults to the input directory.")
+    p.add_argument("--check", help="Check that each store round-trips unchanged.", action="store_true")
+    p.add_argument("--workers", help="Number of worker processes. Defaults to all cores.", type=int, default=None)
+    p.add_argument("--json", help="Print one JSON result per line.", action="store_true")
+    args = p.parse_args()
+
+    out_dir = args.out or args.directory
+    if args.to is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    failed = False
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = []
+        for path in find_stores(args.directory):
+            out_path = None
+            if args.to is not None:
+                out_path = os.path.join(out_dir, store_base(os.path.basename(path)) + args.to)
+                if os.path.abspath(out_path) == os.path.abspath(path):
+                    out_path = None
+            futures.append(pool.submit(process_store, path, out_path, args.check))
+        # Report each file as soon as it finishes.
+        for future in as_completed(futures):
+            result = future.result()
+            failed = failed or "error" in result or result.get("round_trip") is False
+            print(json.dumps(result) if args.json else format_result(result), flush=True)
+    sys.exit(1 if failed else 0)
@@ -6,7 +6,10 @@ from __future__ import annotations
 __author__ = 'Ekramul Islam'
 __since__ = '07/02/2023'
 
-from typing import TypeVar, Generic
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import TypeVar, Generic, Iterable, Iterator
 from data_structures.referential_array import ArrayR
 
 K = TypeVar('K')
@@ -16,6 +19,95 @@ class FullError(Exception):
     pass
 
 
+# Marks the slot of a deleted entry under quadratic probing and double hashing,
+# whose probe sequences can't be repaired by moving the rest of a cluster.
+DELETED = ("<deleted>", None)
+
+
+def full_hash(key: str) -> int:
+    """
+    Full-width hash of a string key, independent of any table size.
+
+    :complexity: O(len(key)), computed in C rather than character by character.
+    """
+    return zlib.crc32(key.encode())
+
+
+def full_hashes(keys: Iterable[str]) -> list[int]:
+    """
+    Full-width hashes of many string keys, for bulk operations.
+
+    :complexity: O(total length of the keys), with no Python-level loop per key.
+    """
+    return list(map(zlib.crc32, map(str.encode, keys)))
+
+
+@lru_cache(maxsize=None)
+def _is_prime(n: int) -> bool:
+    """
+    :complexity: O(sqrt(n)), once per n.
+    """
+    if n < 2:
+        return False
+    divisor = 2
+    while divisor * divisor <= n:
+        if n % divisor == 0:
+            return False
+        divisor += 1
+    return True
+
+
+def check_sizes(probing: str, sizes: list[int]) -> None:
+    """
+    Check that table sizes suit a probing strategy. Quadratic probing and double hashing
+    are only sure to reach a free slot of a table at most half full when its size is prime.
+
+    :raises ValueError: when probing is "quadratic" or "double" and a size is not prime.
+    :complexity: O(S * sqrt(M)) where S is len(sizes) and M the largest size, O(S) once checked.
+    """
+    if probing in ("quadratic", "double"):
+        for size in sizes:
+            if not _is_prime(size):
+                raise ValueError(f"{probing} probing needs prime table sizes, not {size}")
+
+
+def cluster_sizes(used: list[bool]) -> list[int]:
+    """
+    The sizes of the runs of used slots in a table, where the last slot is followed by the first.
+
+    :complexity: O(len(used))
+    """
+    if all(used):
+        return [len(used)] if used else []
+    # Start after an empty slot, so that no cluster wraps around the end.
+    start = used.index(False) + 1
+    clusters = []
+    run = 0
+    for i in range(len(used)):
+        if used[(start + i) % len(used)]:
+            run += 1
+        elif run:
+            clusters.append(run)
+            run = 0
+    return clusters
+
+
+def summarise_probes(probing: str, lengths: list[int], clusters: list[int], tombstones: int = 0) -> dict:
+    """
+    The probe_stats() summary of some probe lengths and cluster sizes.
+
+    :complexity: O(len(lengths) + len(clusters) log len(clusters))
+    """
+    return {
+        "probing": probing,
+        "entries": len(lengths),
+        "tombstones": tombstones,
+        "mean_probe_length": sum(lengths) / len(lengths) if lengths else 0.0,
+        "max_probe_length": max(lengths, default=0),
+        "cluster_sizes": dict(sorted(Counter(clusters).items())),
+    }
+
+
 class LinearProbeTable(Generic[K, V]):
     """
     Linear Probe Table.
@@ -25,73 +117,182 @@ class LinearProbeTable(Generic[K, V]):
                 Otherwise `hash` should be overwritten.
         - V:    Value Type.
 
+    The full-width hash of each key is stored in `hashes`, alongside its entry, so
+    resizing never hashes a key again and probing only compares keys whose hashes match.
+    Replacing `hash` on an instance still works, but disables both shortcuts.
+
+    The probing strategy is chosen when the table is made:
+        - "linear":     try the next slot. Deleting moves the rest of the cluster back.
+        - "quadratic":  try the slots 1, 4, 9, ... after the home slot.
+        - "double":     step by an amount taken from the full-width hash, so keys
+                        sharing a home slot follow different sequences.
+        - "robin_hood": linear probing, but an insert takes the slot of any entry
+                        closer to its home slot than the new key is, and moves that
+                        entry on. Probe lengths stay even, and searches for missing
+                        keys stop early. Deleting shifts the rest of the cluster back.
+    Quadratic probing and double hashing delete by leaving a DELETED marker, which
+    searches step over and inserts reuse. The table is rebuilt at the same size
+    once entries and markers together fill half of it.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
     # No test case should exceed 1 million entries.
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
-    HASH_BASE = 31
+    PROBING = ("linear", "quadratic", "double", "robin_hood")
 
-    def __init__(self, sizes=None) -> None:
+    # Tables shrink when deleting leaves them less full than this.
+    MIN_LOAD = 1 / 8
+
+    def __init__(self, sizes=None, size_hint=None, probing="linear") -> None:
         """
         Initialise the Hash Table.
+        If size_hint is given, the table starts big enough to hold that many keys without resizing.
+
+        :raises ValueError: when probing is not one of PROBING, or sizes don't suit it (see check_sizes).
         """
+        if probing not in self.PROBING:
+            raise ValueError(f"Unknown probing strategy {probing}")
         if sizes is not None:
+            check_sizes(probing, sizes)
             self.TABLE_SIZES = sizes
-        self.size_index = 0
+        self.probing = probing
+        self.tombstones = 0
+        self.size_index = 0 if size_hint is None else self._size_index_for(size_hint)
         self.array:ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZES[self.size_index]) 
+        self.hashes:ArrayR[int] = ArrayR(self.TABLE_SIZES[self.size_index])
         self.count = 0
 
+    def hash_full(self, key: K) -> int:
+        """
+        Full-width hash of a key, which doesn't depend on the table size.
+
+        :complexity: O(len(key))
+        """
+        return full_hash(key)
+
+    def hash_many(self, keys: Iterable[K]) -> list[int]:
+        """
+        Full-width hashes of many keys at once.
+
+        :complexity: O(total length of the keys)
+        """
+        if type(self).hash_full is LinearProbeTable.hash_full and 'hash_full' not in vars(self):
+            return full_hashes(keys)
+        return [self.hash_full(key) for key in keys]
+
     def hash(self, key: K) -> int:
         """
         Hash a key for insert/retrieve/update into the hashtable.
 
         :complexity: O(len(key))
         """
+        return self.hash_full(key) % self.table_size
 
-        value = 0
-        a = 31415
-        for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
-        return value
+    @property
+    def custom_hash(self) -> bool:
+        """
+        Whether `hash` has been replaced, so positions can't be worked out from stored hashes.
+        """
+        return 'hash' in vars(self) or type(self).hash is not LinearProbeTable.hash
+
+    def _home(self, key: K, full: int | None) -> int:
+        """
+        The position key hashes to, from its full-width hash when there is one.
+        """
+        if full is None:
+            return self.hash(key)
+        return full % self.table_size
 
     @property
     def table_size(self) -> int:
         return len(self.array)
 
+    def _size_index_for(self, n: int) -> int:
+        """
+        The smallest size index whose table holds n keys without resizing.
+
+        :complexity: O(len(TABLE_SIZES))
+        """
+        for i, size in enumerate(self.TABLE_SIZES):
+            if n <= size / 2:
+                return i
+        return len(self.TABLE_SIZES) - 1
+
+    def reserve(self, n: int) -> None:
+        """
+        Resize the table, at most once, so that it holds n keys without resizing again.
+
+        :complexity: O(N) if the table is resized, where N is the new table size, otherwise O(len(TABLE_SIZES)).
+        """
+        size_index = self._size_index_for(n)
+        if size_index > self.size_index:
+            self.size_index = size_index - 1
+            self._rehash()
+
     def __len__(self) -> int:
         """
         Returns number of elements in the hash table
         """
         return self.count
 
-    def _linear_probe(self, key: K, is_insert: bool) -> int:
+    def _steps(self, full: int | None) -> tuple[int, int]:
         """
-        Find the correct position for this key in the hash table using linear probing.
+        The first step of the probe sequence, and how much each later step grows by.
+        Double hashing falls back to linear probing when `hash` has been replaced.
+        """
+        if self.probing == "quadratic":
+            return 1, 2
+        if self.probing == "double" and full is not None:
+            return 1 + (full // self.table_size) % max(self.table_size - 1, 1), 0
+        return 1, 0
+
+    def _distance(self, position: int) -> int:
+        """
+        How far the entry at position is from its home slot, under linear probing.
+        """
+        return (position - self._home(self.array[position][0], self.hashes[position])) % self.table_size
+
+    def _linear_probe(self, key: K, is_insert: bool, full: int | None = None) -> int:
+        """
+        Find the correct position for this key in the hash table using the table's probing strategy.
+        full is the key's full-width hash, if already known.
+        When inserting a new key under Robin Hood probing, the position returned may hold an
+        entry that the key takes the place of.
         :complexity best: O(hash(key)) first position is empty
         :complexity worst: O(hash(key) + N*comp(K)) when we've searched the entire table
                         where N is the tablesize
         :raises KeyError: When the key is not in the table, but is_insert is False.
         :raises FullError: When a table is full and cannot be inserted.
         """
+        if full is None and not self.custom_hash:
+            full = self.hash_full(key)
         # Initial position
-        position = self.hash(key)
-
-        for _ in range(self.table_size):
-            if self.array[position] is None:
-                # Empty spot. Am I upserting or retrieving?
+        position = self._home(key, full)
+        step, growth = self._steps(full)
+        robin_hood = self.probing == "robin_hood"
+        free = None
+
+        for distance in range(self.table_size):
+            item = self.array[position]
+            if item is None or (robin_hood and self._distance(position) < distance):
+                # Empty spot, or under Robin Hood, an entry the key would have displaced.
                 if is_insert:
-                    return position
+                    return position if free is None else free
                 else:
                     raise KeyError(key)
-            elif self.array[position][0] == key:
+            elif item is DELETED:
+                if free is None:
+                    free = position
+            elif (full is None or self.hashes[position] == full) and item[0] == key:
                 return position
-            else: 
-                # Taken by something else. Time to linear probe.
-                position = (position + 1) % self.table_size
-                                                                        
+            # Taken by something else. Time to probe.
+            position = (position + step) % self.table_size
+            step += growth
+
+        if is_insert and free is not None:
+            return free
         if is_insert:
             raise FullError("Table is full!")
         else:
@@ -105,7 +306,7 @@ class LinearProbeTable(Generic[K, V]):
         """
         res = []
         for x in range(self.table_size):
-            if self.array[x] is not None:
+            if self.array[x] is not None and self.array[x] is not DELETED:
                 res.append(self.array[x][0])
         return res
 
@@ -117,10 +318,20 @@ class LinearProbeTable(Generic[K, V]):
         """
         res = []
         for x in range(self.table_size):
-            if self.array[x] is not None:
+            if self.array[x] is not None and self.array[x] is not DELETED:
                 res.append(self.array[x][1])
         return res
 
+    def iter_items(self) -> Iterator[tuple[K, V]]:
+        """
+        Returns an iterator of all (key, value) pairs in the hash table.
+
+        :complexity: O(N) to iterate fully, where N is self.table_size.
+        """
+        for item in self.array:
+            if item is not None and item is not DELETED:
+                yield item
+
     def __contains__(self, key: K) -> bool:
         """
         Checks to see if the given key is in the Hash Table
@@ -151,38 +362,132 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises FullError: when the table cannot be resized further.
         """
+        self._set(key, data, None if self.custom_hash else self.hash_full(key))
+
+    def _set(self, key: K, data: V, full: int | None) -> None:
+        """
+        Set a (key, value) pair whose full-width hash is already known.
 
-        position = self._linear_probe(key, True)
+        :complexity: See linear probe, without hashing the key.
+        """
+        position = self._linear_probe(key, True, full)
+        item = self.array[position]
 
-        if self.array[position] is None:
+        if item is None or item is DELETED or item[0] != key:
             self.count += 1
+            if item is DELETED:
+                self.tombstones -= 1
+            elif item is not None:
+                # Robin Hood: take the place of a nearer entry, and move it on.
+                self._displace(position)
 
         self.array[position] = (key, data)
+        self.hashes[position] = full
 
         if len(self) > self.table_size / 2:
             self._rehash()
+        elif len(self) + self.tombstones > self.table_size / 2:
+            self._rebuild(self.size_index)
+
+    def _displace(self, position: int) -> None:
+        """
+        Under Robin Hood probing, empty the slot at position by moving its entry further
+        along the cluster. Each entry moved takes the place of the next entry nearer to its
+        home slot than itself.
+
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        """
+        item, full = self.array[position], self.hashes[position]
+        distance = self._distance(position)
+        self.array[position] = None
+        self.hashes[position] = None
+        while True:
+            position = (position + 1) % self.table_size
+            distance += 1
+            if self.array[position] is None:
+                self.array[position] = item
+                self.hashes[position] = full
+                return
+            resident_distance = self._distance(position)
+            if resident_distance < distance:
+                item, self.array[position] = self.array[position], item
+                full, self.hashes[position] = self.hashes[position], full
+                distance = resident_distance
+
+    def update(self, items: Iterable[tuple[K, V]]) -> None:
+        """
+        Set many (key, value) pairs, hashing all of the keys in one batch.
+
+        :complexity: O(total length of the keys) plus linear probing for each pair.
+        """
+        items = list(items)
+        if self.custom_hash:
+            hashes = [None] * len(items)
+        else:
+            hashes = self.hash_many(key for key, _ in items)
+        for (key, data), full in zip(items, hashes):
+            self._set(key, data, full)
 
     def __delitem__(self, key: K) -> None:
         """
         Deletes a (key, value) pair in our hash table.
 
+        Under linear and Robin Hood probing, later entries of the cluster are shifted back
+        into the gap, using their stored hashes. Under quadratic probing and double hashing,
+        a DELETED marker is left instead. The table shrinks once it is less than MIN_LOAD full.
+
         :complexity best: O(hash(key)) deleting item is not probed and in correct spot.
-        :complexity worst: O(N*hash(key)+N^2*comp(K)) deleting item is midway through large chain.
+        :complexity worst: O(hash(key) + C*comp(K)) where C is the length of the cluster,
+        or O(N) when the table shrinks, amortised O(hash(key) + C*comp(K)).
         :raises KeyError: when the key doesn't exist.
         """
         position = self._linear_probe(key, False)
-        # Remove the element
-        self.array[position] = None
         self.count -= 1
-        # Start moving over the cluster
-        position = (position + 1) % self.table_size
-        while self.array[position] is not None:
-            key2, value = self.array[position]
-            self.array[position] = None
-            # Reinsert.
-            newpos = self._linear_probe(key2, True)
-            self.array[newpos] = (key2, value)
-            position = (position + 1) % self.table_size
+        if self.probing in ("quadratic", "double"):
+            # Other probe sequences may pass through this slot, so leave a marker.
+            self.array[position] = DELETED
+            self.hashes[position] = None
+            self.tombstones += 1
+        else:
+            self._shift_back(position)
+        self._shrink()
+
+    def _shift_back(self, hole: int) -> None:
+        """
+        Empty the slot at hole, and move later entries of its cluster back into the gap,
+        without rehashing their keys.
+
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        """
+        self.array[hole] = None
+        self.hashes[hole] = None
+        following = (hole + 1) % self.table_size
+        while self.array[following] is not None:
+            if self.probing == "robin_hood":
+                # Entries stay in order of home slot, so stop at one already in its home slot.
+                if self._distance(following) == 0:
+                    return
+                can_move = True
+            else:
+                # An entry can fill the hole only if the hole lies between its home slot and itself.
+                can_move = self._distance(following) >= (following - hole) % self.table_size
+            if can_move:
+                self.array[hole], self.hashes[hole] = self.array[following], self.hashes[following]
+                self.array[following] = None
+                self.hashes[following] = None
+                hole = following
+            following = (following + 1) % self.table_size
+
+    def _shrink(self) -> None:
+        """
+        Rebuild the table at a smaller size once it is less than MIN_LOAD full, leaving it at most a quarter full.
+
+        :complexity: O(N) when the table shrinks, where N is the table size, otherwise O(1).
+        """
+        if self.size_index > 0 and len(self) < self.table_size * self.MIN_LOAD:
+            size_index = self._size_index_for(2 * len(self))
+            if size_index < self.size_index:
+                self._rebuild(size_index)
 
     def is_empty(self) -> bool:
         return self.count == 0
@@ -194,21 +499,133 @@ class LinearProbeTable(Generic[K, V]):
         """
         Need to resize table and reinsert all values
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
+        :complexity best: O(N) No probing, as the stored hashes are reused.
+        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing, and `hash` was replaced.
         Where N is len(self)
         """
-        old_array = self.array
-        self.size_index += 1
-        if self.size_index == len(self.TABLE_SIZES):
+        if self.size_index + 1 == len(self.TABLE_SIZES):
             # Cannot be resized further.
             return
+        self._rebuild(self.size_index + 1)
+
+    def _rebuild(self, size_index: int) -> None:
+        """
+        Reinsert all values into a new, empty array of the given size, dropping DELETED markers.
+
+        Keys are known to be distinct, so entries are placed straight into the first free
+        slot of their probe sequence, from their stored hashes, with no key comparisons,
+        load checks or nested resizes. The placing is done on plain lists, which are
+        copied in and out of the ArrayRs in one step each.
+
+        :raises FullError: when the entries can't all be placed, leaving the table unchanged.
+        :complexity: See _rehash.
+        """
+        old_state = self.array, self.hashes, self.size_index, self.count, self.tombstones
+        old_items, old_hashes = self.array.array[:], self.hashes.array[:]
+        entries = [(item, full) for item, full in zip(old_items, old_hashes) if item is not None and item is not DELETED]
+        self.size_index = size_index
         self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
-        for item in old_array:
-            if item is not None:
-                key, value = item
-                self[key] = value
+        self.hashes = ArrayR(self.TABLE_SIZES[self.size_index])
+        self.count = len(entries)
+        self.tombstones = 0
+
+        size = self.table_size
+        if len(entries) > size:
+            self.array, self.hashes, self.size_index, self.count, self.tombstones = old_state
+            raise FullError("Table is full!")
+        items, hashes = [None] * size, [None] * size
+        if self.custom_hash:
+            homes = [self.hash(item[0]) for item, _ in entries]
+        else:
+            homes = [full % size for _, full in entries]
+
+        if self.probing == "robin_hood":
+            slot_homes = [0] * size
+            # In order of home slot, entries are rarely displaced.
+            for (item, full), home in sorted(zip(entries, homes), key=lambda entry: entry[1]):
+                position, distance = home, 0
+                while items[position] is not None:
+                    resident_distance = (position - slot_homes[position]) % size
+                    if resident_distance < distance:
+                        item, items[position] = items[position], item
+                        full, hashes[position] = hashes[position], full
+                        home, slot_homes[position] = slot_homes[position], home
+                        distance = resident_distance
+                    position = (position + 1) % size
+                    distance += 1
+                items[position], hashes[position], slot_homes[position] = item, full, home
+        elif self.probing == "linear":
+            for (item, full), position in zip(entries, homes):
+                while items[position] is not None:
+                    position = (position + 1) % size
+                items[position] = item
+                hashes[position] = full
+        else:
+            for (item, full), position in zip(entries, homes):
+                step, growth = self._steps(full)
+                probes = 0
+                while items[position] is not None:
+                    # The probe sequence may not reach every slot, so give up as _linear_probe does.
+                    probes += 1
+                    if probes == size:
+                        self.array, self.hashes, self.size_index, self.count, self.tombstones = old_state
+                        raise FullError("Table is full!")
+                    position = (position + step) % size
+                    step += growth
+                items[position] = item
+                hashes[position] = full
+
+        self.array.array[:] = items
+        self.hashes.array[:] = hashes
+
+    def _occupied(self) -> list[tuple[int, K, int | None]]:
+        """
+        The position, key and stored hash of every entry.
+        """
+        return [(i, item[0], self.hashes[i]) for i, item in enumerate(self.array) if item is not None and item is not DELETED]
+
+    def _used(self) -> list[bool]:
+        """
+        Whether each slot holds an entry or a DELETED marker, so lengthens probe sequences.
+        """
+        return [item is not None for item in self.array]
+
+    def _probe_length(self, position: int, key: K, full: int | None) -> int:
+        """
+        The number of slots a search for the entry at position looks at.
+
+        :complexity: O(probe length)
+        """
+        current = self._home(key, full)
+        step, growth = self._steps(full)
+        length = 1
+        while current != position and length <= self.table_size:
+            current = (current + step) % self.table_size
+            step += growth
+            length += 1
+        return length
+
+    def probe_data(self) -> tuple[list[int], list[int]]:
+        """
+        The probe length of every entry, and the size of every cluster of used slots.
+
+        :complexity: O(N + total probe length) where N is the table size.
+        """
+        lengths = [self._probe_length(position, key, full) for position, key, full in self._occupied()]
+        return lengths, cluster_sizes(self._used())
+
+    def probe_stats(self) -> dict:
+        """
+        Probe lengths and clustering, for tuning the probing strategy to a workload.
+
+        Returns the strategy, the number of entries and DELETED markers, the mean and
+        maximum number of slots a successful search looks at, and a histogram mapping
+        each cluster size to how many clusters of used slots have that size.
+
+        :complexity: See probe_data.
+        """
+        lengths, clusters = self.probe_data()
+        return summarise_probes(self.probing, lengths, clusters, self.tombstones)
 
     def __str__(self) -> str:
         """
@@ -218,7 +635,7 @@ class LinearProbeTable(Generic[K, V]):
         """
         result = ""
         for item in self.array:
-            if item is not None:
+            if item is not None and item is not DELETED:
                 (key, value) = item
                 result += "(" + str(key) + "," + str(value) + ")\n"
         return result
@@ -238,15 +655,15 @@ if '__main__' == __name__:
     # contains
     print("Jim" in linear_table)  # False
     # return all keys in table
-    print(linear_table.keys())  # ['Tim', 'Tom', 'Tam']
+    print(linear_table.keys())  # ['Tam', 'Tom', 'Tim']
     # return all values in table
-    print(linear_table.values())  # [4, 3, 3]
+    print(linear_table.values())  # [3, 3, 4]
     # length of table (number of elements)
     print(len(linear_table))  # 3
     # print all contents of table
     print(linear_table)
     # get hash value of key
-    linear_table.hash('Jim')  # 0
+    linear_table.hash('Jim')  # 10
     # get table size (size of array)
     print(linear_table.table_size)  # 13
     # is empty
@@ -255,4 +672,4 @@ if '__main__' == __name__:
     print(linear_table.is_full()) # False
     # linear probe
     # linear_table._linear_probe('Jim', False)  # keyError
-    print(linear_table._linear_probe('Jim', True)) # 4 
+    print(linear_table._linear_probe('Jim', True)) # 10
@@ -0,0 +1,279 @@
+""" Parallel Array Hash Table
+
+Defines a Hash Table using Linear Probing that stores its keys, values and
+hashes in three parallel arrays, rather than one (key, value) tuple per slot.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Iterator, TypeVar
+
+from data_structures.hash_table import LinearProbeTable, FullError
+from data_structures.referential_array import ArrayR
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, and only needed for numpy_hashes=True.
+    np = None
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+# Stored in the hash column for empty slots, and for keys placed by a replaced `hash`.
+NO_HASH = -1
+
+
+class ParallelProbeTable(LinearProbeTable[K, V]):
+    """
+    Linear Probe Table with parallel key, value and hash arrays.
+
+    Type Arguments:
+        - K:    Key Type. In most cases should be string.
+                Otherwise `hash` should be overwritten.
+        - V:    Value Type.
+
+    Slots hold no tuples, so setting a value for an existing key only stores the
+    new value. A slot is empty when its key is None. Hashes are machine integers
+    in an array('q'), or in a NumPy array when numpy_hashes is set, in which case
+    resizing works out every new home position in one vectorised step.
+
+    The API is the same as LinearProbeTable's, except that there is no `array`,
+    and only linear probing is supported.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    def __init__(self, sizes=None, size_hint=None, probing="linear", numpy_hashes=False) -> None:
+        """
+        Initialise the Hash Table.
+        If size_hint is given, the table starts big enough to hold that many keys without resizing.
+
+        :raises ValueError: when probing is not "linear".
+        :raises ImportError: when numpy_hashes is set but NumPy is not installed.
+        """
+        if probing != "linear":
+            raise ValueError("ParallelProbeTable only supports linear probing")
+        if numpy_hashes and np is None:
+            raise ImportError("numpy_hashes needs NumPy to be installed")
+        if sizes is not None:
+            self.TABLE_SIZES = sizes
+        self.probing = probing
+        self.tombstones = 0
+        self.numpy_hashes = numpy_hashes
+        self.size_index = 0 if size_hint is None else self._size_index_for(size_hint)
+        self._allocate(self.TABLE_SIZES[self.size_index])
+        self.count = 0
+
+    def _allocate(self, size: int) -> None:
+        """
+        Replace the arrays with empty arrays of the given size.
+
+        :complexity: O(size)
+        """
+        self.key_array: ArrayR[K] = ArrayR(size)
+        self.value_array: ArrayR[V] = ArrayR(size)
+        if self.numpy_hashes:
+            self.hashes = np.full(size, NO_HASH, dtype=np.int64)
+        else:
+            self.hashes = array('q', [NO_HASH]) * size
+
+    @property
+    def table_size(self) -> int:
+        return len(self.key_array)
+
+    def _linear_probe(self, key: K, is_insert: bool, full: int | None = None) -> int:
+        """
+        Find the correct position for this key in the hash table using linear probing.
+        full is the key's full-width hash, if already known.
+        :complexity best: O(hash(key)) first position is empty
+        :complexity worst: O(hash(key) + N*comp(K)) when we've searched the entire table
+                        where N is the tablesize
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        if full is None and not self.custom_hash:
+            full = self.hash_full(key)
+        position = self._home(key, full)
+        keys, hashes, size = self.key_array, self.hashes, self.table_size
+
+        for _ in range(size):
+            slot_key = keys[position]
+            if slot_key is None:
+                if is_insert:
+                    return position
+                raise KeyError(key)
+            elif (full is None or hashes[position] == full) and slot_key == key:
+                return position
+            position = (position + 1) % size
+
+        if is_insert:
+            raise FullError("Table is full!")
+        raise KeyError(key)
+
+    def keys(self) -> list[K]:
+        """
+        Returns all keys in the hash table.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        return [key for key in self.key_array if key is not None]
+
+    def values(self) -> list[V]:
+        """
+        Returns all values in the hash table.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        keys, values = self.key_array, self.value_array
+        return [values[i] for i in range(self.table_size) if keys[i] is not None]
+
+    def iter_items(self) -> Iterator[tuple[K, V]]:
+        """
+        Returns an iterator of all (key, value) pairs in the hash table.
+
+        :complexity: O(N) to iterate fully, where N is self.table_size.
+        """
+        keys, values = self.key_array, self.value_array
+        for i in range(self.table_size):
+            if keys[i] is not None:
+                yield keys[i], values[i]
+
+    def __getitem__(self, key: K) -> V:
+        """
+        Get the value at a certain key
+
+        :complexity: See linear probe.
+        :raises KeyError: when the key doesn't exist.
+        """
+        return self.value_array[self._linear_probe(key, False)]
+
+    def _set(self, key: K, data: V, full: int | None) -> None:
+        """
+        Set a (key, value) pair whose full-width hash is already known.
+
+        :complexity: See linear probe, without hashing the key.
+        """
+        position = self._linear_probe(key, True, full)
+
+        if self.key_array[position] is None:
+            self.count += 1
+            self.key_array[position] = key
+            self.hashes[position] = NO_HASH if full is None else full
+        self.value_array[position] = data
+
+        if len(self) > self.table_size / 2:
+            self._rehash()
+
+    def __delitem__(self, key: K) -> None:
+        """
+        Deletes a (key, value) pair in our hash table.
+        Later entries of the cluster are shifted back into the gap, using their stored hashes,
+        and the table shrinks once it is less than MIN_LOAD full.
+
+        :complexity best: O(hash(key)) deleting item is not probed and in correct spot.
+        :complexity worst: O(hash(key) + C*comp(K)) where C is the length of the cluster,
+        or O(N) when the table shrinks, amortised O(hash(key) + C*comp(K)).
+        :raises KeyError: when the key doesn't exist.
+        """
+        position = self._linear_probe(key, False)
+        self.count -= 1
+        self._shift_back(position)
+        self._shrink()
+
+    def _distance(self, position: int) -> int:
+        """
+        How far the entry at position is from its home slot.
+        """
+        full = self.hashes[position]
+        return (position - self._home(self.key_array[position], None if full == NO_HASH else int(full))) % self.table_size
+
+    def _shift_back(self, hole: int) -> None:
+        """
+        Empty the slot at hole, and move later entries of its cluster back into the gap,
+        without rehashing their keys.
+
+        :complexity: O(C) where C is the length of the rest of the cluster.
+        """
+        keys, values, hashes, size = self.key_array, self.value_array, self.hashes, self.table_size
+        self._clear(hole)
+        following = (hole + 1) % size
+        while keys[following] is not None:
+            # An entry can fill the hole only if the hole lies between its home slot and itself.
+            if self._distance(following) >= (following - hole) % size:
+                keys[hole], values[hole], hashes[hole] = keys[following], values[following], hashes[following]
+                self._clear(following)
+                hole = following
+            following = (following + 1) % size
+
+    def _occupied(self) -> list[tuple[int, K, int | None]]:
+        """
+        The position, key and stored hash of every entry.
+        """
+        keys, hashes = self.key_array, self.hashes
+        return [(i, keys[i], None if hashes[i] == NO_HASH else int(hashes[i])) for i in range(self.table_size) if keys[i] is not None]
+
+    def _used(self) -> list[bool]:
+        return [key is not None for key in self.key_array]
+
+    def _clear(self, position: int) -> None:
+        self.key_array[position] = None
+        self.value_array[position] = None
+        self.hashes[position] = NO_HASH
+
+    def _rehash(self) -> None:
+        """
+        Need to resize table and reinsert all values
+
+        :complexity best: O(N) No probing, as the stored hashes are reused.
+        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing, and `hash` was replaced.
+        Where N is len(self)
+        """
+        if self.size_index + 1 == len(self.TABLE_SIZES):
+            # Cannot be resized further.
+            return
+        self._rebuild(self.size_index + 1)
+
+    def _rebuild(self, size_index: int) -> None:
+        """
+        Reinsert all values into new, empty arrays of the given size.
+
+        Keys are known to be distinct, so entries are placed straight into the first free
+        slot from their stored hashes, with no key comparisons, load checks or nested
+        resizes. The placing is done on plain lists, which are copied in and out of the
+        arrays in one step each.
+
+        :complexity: See _rehash.
+        """
+        old_keys, old_values = self.key_array.array[:], self.value_array.array[:]
+        old_hashes = self.hashes
+        self.size_index = size_index
+        self._allocate(self.TABLE_SIZES[self.size_index])
+        size = self.table_size
+
+        occupied = [i for i, key in enumerate(old_keys) if key is not None]
+        if self.custom_hash:
+            homes = [self.hash(old_keys[i]) for i in occupied]
+        elif self.numpy_hashes:
+            homes = (old_hashes[occupied] % size).tolist()
+        else:
+            homes = [old_hashes[i] % size for i in occupied]
+
+        keys, values, hashes = [None] * size, [None] * size, [NO_HASH] * size
+        for i, position in zip(occupied, homes):
+            while keys[position] is not None:
+                position = (position + 1) % size
+            keys[position] = old_keys[i]
+            values[position] = old_values[i]
+            hashes[position] = old_hashes[i]
+        self.key_array.array[:] = keys
+        self.value_array.array[:] = values
+        self.hashes[:] = np.array(hashes, dtype=np.int64) if self.numpy_hashes else array('q', hashes)
+        self.count = len(occupied)
+
+    def __str__(self) -> str:
+        """
+        Returns all they key/value pairs in our hash table (no particular
+        order).
+        :complexity: O(N * (str(key) + str(value))) where N is the table size
+        """
+        return "".join("(" + str(key) + "," + str(value) + ")\n" for key, value in self.iter_items())
@@ -0,0 +1,260 @@
+""" Blocked Sorted List
+
+Defines a sorted container made of a list of short sorted blocks.
+Inserting or deleting only shifts elements within one block, and a Fenwick
+tree over the block lengths answers rank and select queries in O(log n).
+"""
+from __future__ import annotations
+
+import bisect
+from typing import Generic, Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+
+class BlockedSortedList(Generic[T]):
+    """
+    Blocked Sorted List.
+
+    Type Arguments:
+        - T:    Element type. Elements must be totally ordered.
+
+    Blocks hold between 1 and 2 * LOAD elements, so shifting within a block
+    costs O(LOAD), which is treated as a constant below.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    LOAD = 512
+    # update() merges in one pass once the batch is at least 1/MERGE_RATIO of the list.
+    MERGE_RATIO = 16
+
+    def __init__(self, items: Iterable[T] | None = None) -> None:
+        """
+        Create a sorted list holding items.
+
+        :complexity: O(n log n) where n is the number of items.
+        """
+        self.blocks: list[list[T]] = []
+        self.maxes: list[T] = []
+        self.tree: list[int] = []
+        self.size = 0
+        if items is not None:
+            self._build(sorted(items))
+
+    def _build(self, ordered: list[T]) -> None:
+        """
+        Replace the contents with an already sorted list.
+
+        :complexity: O(n)
+        """
+        self.blocks = [ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.size = len(ordered)
+        self._build_tree()
+
+    def _build_tree(self) -> None:
+        """
+        Rebuild the Fenwick tree over the block lengths.
+
+        :complexity: O(B) where B is the number of blocks.
+        """
+        tree = [len(block) for block in self.blocks]
+        for i in range(len(tree)):
+            parent = i | (i + 1)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _tree_add(self, block_index: int, delta: int) -> None:
+        """
+        :complexity: O(log B)
+        """
+        while block_index < len(self.tree):
+            self.tree[block_index] += delta
+            block_index |= block_index + 1
+
+    def _prefix(self, block_index: int) -> int:
+        """
+        Number of elements in the blocks before block_index.
+
+        :complexity: O(log B)
+        """
+        total = 0
+        while block_index > 0:
+            total += self.tree[block_index - 1]
+            block_index &= block_index - 1
+        return total
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        """
+        The block holding the element at index, and its offset in that block.
+
+        :complexity: O(log B)
+        """
+        block_index = 0
+        step = 1 << len(self.tree).bit_length()
+        while step:
+            candidate = block_index + step
+            if candidate <= len(self.tree) and self.tree[candidate - 1] <= index:
+                index -= self.tree[candidate - 1]
+                block_index = candidate
+            step >>= 1
+        return block_index, index
+
+    def add(self, item: T) -> None:
+        """
+        Insert item, keeping the list sorted. Equal items are kept.
+
+        :complexity: O(log n) amortised.
+        """
+        if not self.blocks:
+            self.blocks.append([item])
+            self.maxes.append(item)
+            self.size = 1
+            self._build_tree()
+            return
+        i = bisect.bisect_left(self.maxes, item)
+        if i == len(self.blocks):
+            i -= 1
+        block = self.blocks[i]
+        bisect.insort(block, item)
+        self.maxes[i] = block[-1]
+        self.size += 1
+        if len(block) > 2 * self.LOAD:
+            self.blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self.maxes[i:i + 1] = [block[self.LOAD - 1], block[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def update(self, items: Iterable[T]) -> None:
+        """
+        Insert every item of a batch.
+
+        The batch is sorted once. Small batches are then inserted one by one;
+        large ones are merged with the existing elements in a single pass and
+        the blocks rebuilt, instead of being inserted separately.
+        Both steps use the built-in sort, a run-adaptive mergesort: the
+        concatenation of two sorted runs is merged in one linear pass.
+
+        :complexity: O(m log m + min(m log n, n + m)) where m is the number of items.
+        """
+        items = sorted(items)
+        if len(items) * self.MERGE_RATIO < self.size:
+            for item in items:
+                self.add(item)
+        else:
+            self._build(sorted(list(self) + items))
+
+    def remove(self, item: T) -> None:
+        """
+        Remove one occurrence of item.
+
+        :raises ValueError: when item is not in the list.
+        :complexity: O(log n) amortised.
+        """
+        i = bisect.bisect_left(self.maxes, item)
+        if i == len(self.blocks):
+            raise ValueError(f"{item} is not in list")
+        block = self.blocks[i]
+        j = bisect.bisect_left(block, item)
+        if block[j] != item:
+            raise ValueError(f"{item} is not in list")
+        del block[j]
+        self.size -= 1
+        if block:
+            self.maxes[i] = block[-1]
+            self._tree_add(i, -1)
+        else:
+            del self.blocks[i]
+            del self.maxes[i]
+            self._build_tree()
+
+    def bisect_left(self, item: T) -> int:
+        """
+        The index of the first element >= item, i.e. the number of elements < item.
+
+        :complexity: O(log n)
+        """
+        i = bisect.bisect_left(self.maxes, item)
+        if i == len(self.blocks):
+            return self.size
+        return self._prefix(i) + bisect.bisect_left(self.blocks[i], item)
+
+    def bisect_right(self, item: T) -> int:
+        """
+        The index after the last element <= item, i.e. the number of elements <= item.
+
+        :complexity: O(log n)
+        """
+        i = bisect.bisect_right(self.maxes, item)
+        if i == len(self.blocks):
+            return self.size
+        return self._prefix(i) + bisect.bisect_right(self.blocks[i], item)
+
+    def index(self, item: T) -> int:
+        """
+        The index of the first occurrence of item.
+
+        :raises ValueError: when item is not in the list.
+        :complexity: O(log n)
+        """
+        pos = self.bisect_left(item)
+        if pos == self.size or self[pos] != item:
+            raise ValueError(f"{item} is not in list")
+        return pos
+
+    def __getitem__(self, index: int) -> T:
+        """
+        The element at index, in sorted order.
+
+        :raises IndexError: when index is out of range.
+        :complexity: O(log n)
+        """
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("BlockedSortedList index out of range")
+        i, offset = self._locate(index)
+        return self.blocks[i][offset]
+
+    def islice(self, start: int, stop: int) -> Iterator[T]:
+        """
+        The elements from index start up to, but not including, stop, in sorted order.
+
+        :complexity: O(log n + k) where k is the number of elements returned.
+        """
+        start, stop = max(start, 0), min(stop, self.size)
+        if start >= stop:
+            return
+        i, offset = self._locate(start)
+        remaining = stop - start
+        while remaining:
+            block = self.blocks[i][offset:offset + remaining]
+            yield from block
+            remaining -= len(block)
+            i, offset = i + 1, 0
+
+    def __contains__(self, item: T) -> bool:
+        """
+        :complexity: O(log n)
+        """
+        i = bisect.bisect_left(self.maxes, item)
+        if i == len(self.blocks):
+            return False
+        block = self.blocks[i]
+        return block[bisect.bisect_left(block, item)] == item
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[T]:
+        """
+        :complexity: O(n) to iterate fully.
+        """
+        for block in self.blocks:
+            yield from block
+
+    def __str__(self) -> str:
+        return str(list(self))
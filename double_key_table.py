@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import Generic, TypeVar, Iterator
+from abc import ABC, abstractmethod
+from typing import Generic, TypeVar, Iterable, Iterator
 from data_structures.referential_array import ArrayR
-from data_structures.hash_table import LinearProbeTable, FullError
+from data_structures.hash_table import LinearProbeTable, FullError, full_hash, full_hashes, cluster_sizes, summarise_probes, check_sizes
 
 K = TypeVar('K')
 K1 = TypeVar('K1')
@@ -20,6 +21,10 @@ class DoubleKeyTable(Generic[K1, K2, V]):
                 Otherwise `hash2` should be overwritten.
         - V:    Value Type.
 
+    As in LinearProbeTable, the full-width hash of each top-level key is stored in
+    `hashes`, and the bottom-level tables store the hashes of their own keys.
+    Replacing `hash1` or `hash2` on an instance disables this for that level.
+
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
@@ -27,26 +32,53 @@ class DoubleKeyTable(Generic[K1, K2, V]):
     # This is only for the top layer
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
-    HASH_BASE = 31
-
-    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None) -> None:
+    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None, size_hint:int|None=None, sub_table_class:type=LinearProbeTable, probing:str="linear") -> None:
         """
         Create a new Double Hash Table.
 
         :complexity: O(N) where N is the table size.
         __init__(self, sizes=None, internal_sizes=None) , create the underlying array. If sizes is not None, the provided array should replace the existing TABLE_SIZES to decide the size of the top-level hash table. If internal_sizes is not None, the provided array should replace the existing TABLE_SIZES for the internal hash tables
+        If size_hint is not None, the top-level table starts big enough for that many top-level keys.
+        sub_table_class is the LinearProbeTable class used for the internal hash tables, e.g. ParallelProbeTable.
+        probing is the probing strategy of the internal hash tables, see LinearProbeTable. The top-level table probes linearly.
+        :raises ValueError: when internal_sizes don't suit probing, see check_sizes.
         """
+        self.sub_table_class = sub_table_class
+        self.probing = probing
         if sizes is not None:
             self.TABLE_SIZES = sizes
 
         if internal_sizes is not None:
+            check_sizes(probing, internal_sizes)
             self.internal_sizes = internal_sizes
         else:
             self.internal_sizes = None # will automatically chose in hash_table
 
-        self.size_index = 0  # current size index for top layer
+        self.size_index = 0 if size_hint is None else self._size_index_for(size_hint)  # current size index for top layer
         self.count = 0  # number of elements added
+        self.modifications = 0  # bumped whenever pairs are added or removed, so iterators can fail fast
         self.array:ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZES[self.size_index]) 
+        self.hashes:ArrayR[int] = ArrayR(self.TABLE_SIZES[self.size_index])
+
+
+    def hash_full(self, key: K1|K2) -> int:
+        """
+        Full-width hash of a key, which doesn't depend on the table size.
+
+        :complexity: O(len(key))
+        """
+        return full_hash(key)
+
+
+    def hash_many(self, keys: Iterable[K1|K2]) -> list[int]:
+        """
+        Full-width hashes of many keys at once.
+
+        :complexity: O(total length of the keys)
+        """
+        if type(self).hash_full is DoubleKeyTable.hash_full and 'hash_full' not in vars(self):
+            return full_hashes(keys)
+        return [self.hash_full(key) for key in keys]
 
 
     def hash1(self, key: K1) -> int:
@@ -55,12 +87,7 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :complexity: O(len(key))
         """
-        value = 0
-        a = 31415
-        for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
-        return value
+        return self.hash_full(key) % self.table_size
 
 
     def hash2(self, key: K2, sub_table: LinearProbeTable[K2, V]) -> int:
@@ -69,12 +96,41 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :complexity: O(len(key))
         """
-        value = 0
-        a = 31415
-        for char in key:
-            value = (ord(char) + a * value) % sub_table.table_size
-            a = a * self.HASH_BASE % (sub_table.table_size - 1)
-        return value
+        return self.hash_full(key) % sub_table.table_size
+
+
+    @property
+    def custom_hash1(self) -> bool:
+        """ Whether `hash1` has been replaced, so top-level positions can't be worked out from stored hashes. """
+        return 'hash1' in vars(self) or type(self).hash1 is not DoubleKeyTable.hash1
+
+
+    @property
+    def custom_hash2(self) -> bool:
+        """ Whether `hash2` has been replaced, so bottom-level positions can't be worked out from stored hashes. """
+        return 'hash2' in vars(self) or type(self).hash2 is not DoubleKeyTable.hash2
+
+
+    def _top_hash(self, key1: K1) -> int | None:
+        """ The full-width hash of key1, or None if `hash1` has been replaced. """
+        return None if self.custom_hash1 else self.hash_full(key1)
+
+
+    def _top_home(self, key1: K1, full: int | None) -> int:
+        """ The top-level position key1 hashes to, from its full-width hash when there is one. """
+        if full is None:
+            return self.hash1(key1)
+        return full % self.table_size
+
+
+    def _new_sub_table(self, size_hint: int | None = None) -> LinearProbeTable[K2, V]:
+        """ Create an empty bottom-level table, hashing its keys as hash2 does. """
+        sub_table = self.sub_table_class(self.internal_sizes, size_hint, probing=self.probing)
+        if self.custom_hash2:
+            sub_table.hash = lambda k: self.hash2(k, sub_table)
+        elif type(self).hash_full is not DoubleKeyTable.hash_full or 'hash_full' in vars(self):
+            sub_table.hash_full = self.hash_full
+        return sub_table
     
 
     def _linear_probe(self, key1: K1, key2: K2, is_insert: bool) -> tuple[int, int]:
@@ -90,17 +146,18 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         Your linear probe method should create the internal hash table if is_insert is true and this is the first pair with key1.
         """
         # Initial position
-        top_array_position = self.hash1(key1)
+        full1 = self._top_hash(key1)
+        top_array_position = self._top_home(key1, full1)
 
         for _ in range(self.table_size):
             if self.array[top_array_position] is None:
                 # Empty spot. Am I upserting or retrieving?
                 if is_insert:
-                    # create a new linear probe table and override hash func
-                    new_linear_hash_table = LinearProbeTable(self.internal_sizes)
-                    new_linear_hash_table.hash = lambda k: self.hash2(k, new_linear_hash_table) 
+                    # create a new linear probe table, hashing as hash2 does
+                    new_linear_hash_table = self._new_sub_table()
                     # set value to array position
                     self.array[top_array_position] = (key1,new_linear_hash_table)
+                    self.hashes[top_array_position] = full1
                     self.count+=1
                     # find bottom array position
                     bottom_array_position = new_linear_hash_table._linear_probe(key2,is_insert)
@@ -109,7 +166,7 @@ class DoubleKeyTable(Generic[K1, K2, V]):
                     # item doesn't exist
                     raise KeyError(key1)
                 
-            elif self.array[top_array_position][0] == key1: 
+            elif (full1 is None or self.hashes[top_array_position] == full1) and self.array[top_array_position][0] == key1: 
                 # key and table exists
                 linear_hash_table = self.array[top_array_position][1]
                 # find bottom array position
@@ -125,15 +182,112 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             raise KeyError(key1)
         
 
+    def _size_index_for(self, n: int) -> int:
+        """
+        The smallest size index whose top-level table holds n keys without resizing.
+
+        :complexity: O(len(TABLE_SIZES))
+        """
+        for i, size in enumerate(self.TABLE_SIZES):
+            if n <= size / 2:
+                return i
+        return len(self.TABLE_SIZES) - 1
+
+
+    def reserve(self, n: int) -> None:
+        """
+        Resize the top-level table, at most once, so that it holds n top-level keys without resizing again.
+
+        :complexity: O(N) if the table is resized, where N is the new table size, otherwise O(len(TABLE_SIZES)).
+        """
+        size_index = self._size_index_for(n)
+        if size_index > self.size_index:
+            self.size_index = size_index - 1
+            self._rehash()
+
+
+    def update(self, items: Iterable[tuple[tuple[K1, K2], V]], expected_size: int | None = None) -> None:
+        """
+        Set many ((key1, key2), value) pairs, or every pair of a mapping.
+
+        The pairs are grouped by key1 first, so the top-level table and each
+        bottom-level table are sized once, up front, and never resize part way through.
+        expected_size is the number of top-level keys to size for, if more are expected later.
+
+        :complexity: O(P + K*hash1(key1) + total length of the 2nd keys) plus probing,
+        where P is the number of pairs and K the number of distinct 1st keys.
+        """
+        if hasattr(items, "items"):
+            items = items.items()
+        groups: dict[K1, list[tuple[K2, V]]] = {}
+        for (key1, key2), data in items:
+            groups.setdefault(key1, []).append((key2, data))
+
+        existing = {}
+        for key1 in groups:
+            try:
+                existing[key1] = self.array[self._linear_probe_top_search(key1)][1]
+            except KeyError:
+                pass
+        self.reserve(max(len(self) + len(groups) - len(existing), expected_size or 0))
+
+        for key1, pairs in groups.items():
+            if key1 in existing:
+                sub_table = existing[key1]
+                sub_table.reserve(len(sub_table) + len(pairs))
+            else:
+                sub_table = self._new_sub_table(len(pairs))
+                self._add_top(key1, sub_table)
+            before = len(sub_table)
+            sub_table.update(pairs)
+            if len(sub_table) != before:
+                self.modifications += 1
+
+
+    def _add_top(self, key1: K1, sub_table: LinearProbeTable[K2, V]) -> None:
+        """
+        Add a top-level key that is not yet in the table, with its bottom-level table.
+
+        :raises FullError: When the table is full.
+        :complexity: See _linear_probe_top_search.
+        """
+        full = self._top_hash(key1)
+        position = self._top_home(key1, full)
+        for _ in range(self.table_size):
+            if self.array[position] is None:
+                self.array[position] = (key1, sub_table)
+                self.hashes[position] = full
+                self.count += 1
+                self.modifications += 1
+                if len(self) > self.table_size / 2:
+                    self._rehash()
+                return
+            position = (position + 1) % self.table_size
+        raise FullError("Table is full!")
+
+
     def iter_keys(self, key:K1|None=None) -> Iterator[K1|K2]:
         """
         key = None:
             Returns an iterator of all top-level keys in hash table
         key = k:
             Returns an iterator of all keys in the bottom-hash-table for k.
+
+        :raises KeyError: when k is not in the table.
         """
         return KeyIterator(self,key)
 
+    def iter_items(self, key:K1|None=None) -> Iterator[tuple[K1, K2, V]]:
+        """
+        key = None:
+            Returns an iterator of all (key1, key2, value) entries in the hash table
+        key = k:
+            Returns an iterator of all (k, key2, value) entries in the bottom-hash-table for k.
+
+        :raises KeyError: when k is not in the table.
+        """
+        return ItemIterator(self,key)
+
 
     def keys(self, key:K1|None=None) -> list[K1]:
         """
@@ -146,16 +300,9 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         
         if key is None:
             return [item[0] for item in self.array if item is not None]
-        
-        position = self.hash1(key)
-        if self.array[position] is None:
-            raise KeyError(key)
-        
-        for _ in range(self.table_size):
-            if self.array[position][0] == key:
-                bottom_linear_table = self.array[position][1]
-                return bottom_linear_table.keys()
-            position+=1
+
+        bottom_linear_table = self.array[self._linear_probe_top_search(key)][1]
+        return bottom_linear_table.keys()
 
 
 
@@ -165,7 +312,8 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             Returns an iterator of all values in hash table
         key = k:
             Returns an iterator of all values in the bottom-hash-table for k.
-        
+
+        :raises KeyError: when k is not in the table.
         """
         return ValueIterator(self,key)
       
@@ -181,11 +329,7 @@ class DoubleKeyTable(Generic[K1, K2, V]):
                     values.extend(item[1].values())
             return values
 
-        position = self.hash1(key)
-        if self.array[position] is None:
-            return self.array[position].values()
-        
-        bottom_linear_table = self.array[position][1]
+        bottom_linear_table = self.array[self._linear_probe_top_search(key)][1]
         return bottom_linear_table.values()
 
 
@@ -225,7 +369,10 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         # set value to array positions
         bottom_linear_table = self.array[position1][1]
+        before = len(bottom_linear_table)
         bottom_linear_table[key2] = data
+        if len(bottom_linear_table) != before:
+            self.modifications += 1
 
         if len(self) > self.table_size / 2:
             self._rehash()
@@ -244,32 +391,48 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         bottom_linear_table = self.array[position1][1]
         del bottom_linear_table[key2]
         self.count-=1
+        self.modifications += 1
 
         # If the bottom table is empty, set the top table to None.
         if bottom_linear_table.is_empty():
             self.array[position1] = None
+            self.hashes[position1] = None
         
     def _rehash(self) -> None:
         """
         Need to resize table and reinsert all values
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
+        :complexity best: O(N) No probing, as the stored hashes are reused.
+        :complexity worst: O(N*hash(K) + N^2) Lots of probing, and `hash1` was replaced.
         Where N is len(self)
         """
-        old_array = self.array
+        old_array, old_hashes = self.array, self.hashes
         self.size_index += 1
         if self.size_index == len(self.TABLE_SIZES):
             # Cannot be resized further.
+            self.size_index -= 1
             return
         self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
-        for item in old_array:
-            if item is not None:
-                key1, bottom_linear_table = item
-                position = self.hash1(key1)
-                self.array[position] = item
-                self.count+=1
+        self.hashes = ArrayR(self.TABLE_SIZES[self.size_index])
+        self.modifications += 1
+
+        # Place entries on plain lists, copied in and out of the ArrayRs in one step each.
+        entries = [(item, full) for item, full in zip(old_array.array[:], old_hashes.array[:]) if item is not None]
+        size = self.table_size
+        items, hashes = [None] * size, [None] * size
+        if self.custom_hash1:
+            homes = [self.hash1(item[0]) for item, _ in entries]
+        else:
+            homes = [full % size for _, full in entries]
+        # Keys are distinct, so only an empty slot is needed: no key comparisons or load checks.
+        for (item, full), position in zip(entries, homes):
+            while items[position] is not None:
+                position = (position + 1) % size
+            items[position] = item
+            hashes[position] = full
+        self.array.array[:] = items
+        self.hashes.array[:] = hashes
+        self.count = len(entries)
         
         
     @property
@@ -305,6 +468,32 @@ class DoubleKeyTable(Generic[K1, K2, V]):
                 result += bottom_table.__str__() + "\n"
         return result
     
+    def probe_stats(self) -> dict:
+        """
+        Probe lengths and clustering of the top-level table, and of all the internal tables
+        together. See LinearProbeTable.probe_stats.
+
+        :complexity: O(N + total probe length) where N is the total size of the tables.
+        """
+        top_lengths, used = [], []
+        bottom_lengths, bottom_clusters, tombstones = [], [], 0
+        for position in range(self.table_size):
+            item = self.array[position]
+            used.append(item is not None)
+            if item is not None:
+                key1, bottom_table = item
+                home = self._top_home(key1, self.hashes[position])
+                top_lengths.append((position - home) % self.table_size + 1)
+                lengths, clusters = bottom_table.probe_data()
+                bottom_lengths.extend(lengths)
+                bottom_clusters.extend(clusters)
+                tombstones += bottom_table.tombstones
+
+        return {
+            "top": summarise_probes("linear", top_lengths, cluster_sizes(used)),
+            "bottom": summarise_probes(self.probing, bottom_lengths, bottom_clusters, tombstones),
+        }
+
     def _linear_probe_top_search(self,key1) -> int:
         """
         Linear probe for top level search.
@@ -314,71 +503,94 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         N is the size of the table.
         """
         # Initial position
-        position = self.hash1(key1)
+        full = self._top_hash(key1)
+        position = self._top_home(key1, full)
 
         for _ in range(self.table_size):
             if self.array[position] is None:
                 raise KeyError(key1)
-            elif self.array[position][0] == key1:
+            elif (full is None or self.hashes[position] == full) and self.array[position][0] == key1:
                 return position
             else: 
                 # Taken by something else. Time to linear probe.
                 position = (position + 1) % self.table_size
         raise KeyError(key1)
     
-class KeyIterator:
-    """ A full-blown iterator for iter_keys.
+class _TableIterator(ABC):
+    """ Walks the top-level array, and the bottom-level tables, one slot at a time.
+    Subclasses choose what to yield by implementing _entries.
+
+    Iterating never copies the table, so the whole table is walked in O(N) in total.
+    Like dict, the iterator fails fast with a RuntimeError once the table has
+    pairs added or removed, rather than silently skipping or repeating entries.
     """
     def __init__(self,double_key_table: DoubleKeyTable, key:K1|None=None) -> None:
+        """
+        :raises KeyError: when key is given but is not in the table.
+        :complexity: O(hash1(key)) with probing as in _linear_probe_top_search.
+        """
         self.key = key
-        self.current = 0
         self.double_key_table = double_key_table
-       
-    def __iter__(self):
-        """ Returns itself, as required to be iterable. """
-        return self
+        self.modifications = double_key_table.modifications
+        if key is None:
+            tops = (item for item in double_key_table.array if item is not None)
+        else:
+            tops = iter([double_key_table.array[double_key_table._linear_probe_top_search(key)]])
+        self.entries = self._entries(tops)
 
-    def __next__(self) -> K:
-        """ Returns the next value, as required to be iterable.
-        Raise StioIteration if there are no more values or next key doesn't exist.
-        :complexity best: O(keys(K)) No probing.
-        :complexity worst: O(N*keys(K)) Lots of probing.
-        N is the size of the table.
+    @abstractmethod
+    def _entries(self, tops: Iterator[tuple[K1, LinearProbeTable[K2, V]]]) -> Iterator:
+        """ Yields what this iterator returns, from the given (key1, bottom table) pairs.
         """
-        key_list = self.double_key_table.keys(self.key)
-        while self.current < len(key_list):
-             key = key_list[self.current]
-             self.current += 1
-             return key
-        else:
-            raise StopIteration
-        
-class ValueIterator:
-    """ A full-blown iterator for iter_values.
-    """
-    def __init__(self,double_key_table: DoubleKeyTable, key:K1|None=None) -> None:
-        self.key = key
-        self.current = 0
-        self.double_key_table = double_key_table
-       
+        pass
+
+    @staticmethod
+    def _bottom_items(bottom_table: LinearProbeTable[K2, V]) -> Iterator[tuple[K2, V]]:
+        return bottom_table.iter_items()
+
     def __iter__(self):
         """ Returns itself, as required to be iterable.
         :complexity: O(1)
         """
         return self
 
-    def __next__(self) -> V:
+    def __next__(self):
         """ Returns the next value, as required to be iterable.
-        Raise StioIteration if there are no more values or next key doesn't exist.
-        :complexity best: O(values(K)) No probing.
-        :complexity worst: O(N*values(K)) Lots of probing.
-        N is the size of the table.
+        Raise StopIteration if there are no more values.
+        :raises RuntimeError: when the table was changed since the iterator was made.
+        :complexity: O(1) amortised, O(N) to iterate fully.
+        N is the size of the tables walked.
         """
-        value_list = self.double_key_table.values(self.key)
-        while self.current < len(value_list):
-             value = value_list[self.current]
-             self.current += 1
-             return value
-        else:
-            raise StopIteration
-        
\ No newline at end of file
+        if self.double_key_table.modifications != self.modifications:
+            raise RuntimeError("DoubleKeyTable changed during iteration")
+        return next(self.entries)
+
+
+class KeyIterator(_TableIterator):
+    """ A full-blown iterator for iter_keys.
+    """
+    def _entries(self, tops):
+        for key1, bottom_table in tops:
+            if self.key is None:
+                yield key1
+            else:
+                for key2, _ in self._bottom_items(bottom_table):
+                    yield key2
+
+
+class ValueIterator(_TableIterator):
+    """ A full-blown iterator for iter_values.
+    """
+    def _entries(self, tops):
+        for _, bottom_table in tops:
+            for _, value in self._bottom_items(bottom_table):
+                yield value
+
+
+class ItemIterator(_TableIterator):
+    """ A full-blown iterator for iter_items.
+    """
+    def _entries(self, tops):
+        for key1, bottom_table in tops:
+            for key2, value in self._bottom_items(bottom_table):
+                yield key1, key2, value
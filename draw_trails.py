@@ -212,7 +212,7 @@ class TrailDraw:
             for t in range(101)
         ], (0, 0, 0), 1)
 
-    def box_and_action(self, mouse_pos: tuple[float, float], mode=DrawMode, cur_trail: Trail|None=None, parent_sets: tuple[Trail, str]|None=None) -> tuple[Box|None, function|None, Trail|None]:
+    def box_and_action(self, mouse_pos: tuple[float, float], mode=DrawMode, cur_trail: Trail|None=None, parent_sets: tuple[Trail, str]|None=None, path: tuple[str, ...]=()) -> tuple[Box|None, function|None, Trail|None]:
         if cur_trail is None:
             ref_trail = self.trail
             cur_trail = self.trail.store
@@ -222,15 +222,22 @@ class TrailDraw:
             cur_trail = cur_trail.store
         if mouse_pos not in ref_trail.trail_box:
             return None, None, None
+        # Actions carry the path to the trail they edit and the edit method's name,
+        # so that callers can journal them.
         def set_m(ref, cur_method):
             def func(*m):
                 ref.store = cur_method(*m)
+            func.path, func.op = path, cur_method.__name__
             return func
         def set_parent(parent_set, cur_method):
             parent, attribute = parent_set
             def func(*m):
                 setattr(parent, attribute, cur_method(*m))
+            func.path, func.op = path, cur_method.__name__
             return func
+        def get_mountain():
+            return cur_trail.mountain
+        get_mountain.path, get_mountain.op = path, "edit_mountain"
         if cur_trail is None:
             if mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
                 return ref_trail.trail_box, set_parent(parent_sets, ref_trail.add_mountain_before if mode == DrawMode.ADD_MOUNTAIN else ref_trail.add_empty_branch_before), cur_trail
@@ -238,18 +245,18 @@ class TrailDraw:
             if mouse_pos in cur_trail.before_box and mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
                 return cur_trail.before_box, set_m(ref_trail, cur_trail.add_mountain_before if mode == DrawMode.ADD_MOUNTAIN else cur_trail.add_empty_branch_before), cur_trail
             if mouse_pos in cur_trail.mountain_box and mode in [DrawMode.REMOVE, DrawMode.EDIT]:
-                return cur_trail.mountain_box, (set_m(ref_trail, cur_trail.remove_mountain) if mode == DrawMode.REMOVE else lambda: cur_trail.mountain), cur_trail
+                return cur_trail.mountain_box, (set_m(ref_trail, cur_trail.remove_mountain) if mode == DrawMode.REMOVE else get_mountain), cur_trail
             if mouse_pos in cur_trail.after_box and mode in [DrawMode.ADD_MOUNTAIN, DrawMode.ADD_BRANCH]:
                 return cur_trail.after_box, set_m(ref_trail, cur_trail.add_mountain_after if mode == DrawMode.ADD_MOUNTAIN else cur_trail.add_empty_branch_after), cur_trail
-            return self.box_and_action(mouse_pos, mode, cur_trail.following, (cur_trail, 'following'))
+            return self.box_and_action(mouse_pos, mode, cur_trail.following, (cur_trail, 'following'), path + ('following',))
         else:
             if mouse_pos in cur_trail.branch_start_box and mode == DrawMode.REMOVE:
                 return cur_trail.branch_start_box, set_m(ref_trail, cur_trail.remove_branch), cur_trail
             if mouse_pos in cur_trail.branch_end_box and mode == DrawMode.REMOVE:
                 return cur_trail.branch_end_box, set_m(ref_trail, cur_trail.remove_branch), cur_trail
             if mouse_pos in cur_trail.path_bottom.trail_box:
-                return self.box_and_action(mouse_pos, mode, cur_trail.path_bottom, (cur_trail, 'path_bottom'))
+                return self.box_and_action(mouse_pos, mode, cur_trail.path_bottom, (cur_trail, 'path_bottom'), path + ('path_bottom',))
             if mouse_pos in cur_trail.path_top.trail_box:
-                return self.box_and_action(mouse_pos, mode, cur_trail.path_top, (cur_trail, 'path_top'))
-            return self.box_and_action(mouse_pos, mode, cur_trail.path_follow, (cur_trail, 'path_follow'))
+                return self.box_and_action(mouse_pos, mode, cur_trail.path_top, (cur_trail, 'path_top'), path + ('path_top',))
+            return self.box_and_action(mouse_pos, mode, cur_trail.path_follow, (cur_trail, 'path_follow'), path + ('path_follow',))
         return None, None, None
@@ -0,0 +1,118 @@
+"""
+Streaming pipeline running a query over a JSONL file of serialized trails.
+
+Each input line holds one serialized trail. Lines are read in chunks and
+handed to a pool of worker processes; at most `--in-flight` chunks are
+pending at any time, so memory stays bounded however large the input is and
+reading pauses while the workers catch up. Results are written in input order
+as JSONL, one line per trail.
+
+Example: python ingest_trails.py trails.jsonl results.jsonl --query paths --k 3
+"""
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from serialize import deserialize
+from personality import TopWalker, BottomWalker, LazyWalker
+
+PERSONALITIES = {
+    "top": TopWalker,
+    "bottom": BottomWalker,
+    "lazy": LazyWalker,
+}
+
+
+def positive_int(text: str) -> int:
+    """argparse type for options that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+def run_query(trail, query: str, k: int, personality: str):
+    """Run a single query on a trail, returning a JSON-serializable result."""
+    if query == "mountains":
+        return len(trail.collect_all_mountains())
+    elif query == "route":
+        walker = PERSONALITIES[personality]()
+        trail.follow_path(walker)
+        return [mountain.name for mountain in walker.mountains]
+    elif query == "paths":
+        return len(trail.length_k_paths(k))
+    raise ValueError(f"Unknown query {query}")
+
+
+def process_chunk(start: int, lines: list[str], query: str, k: int, personality: str) -> list[str]:
+    """Deserialize and query every line of a chunk. Runs inside a worker process."""
+    out = []
+    for i, line in enumerate(lines, start):
+        result = {"trail": i}
+        try:
+            result["result"] = run_query(deserialize(json.loads(line)), query, k, personality)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        out.append(json.dumps(result))
+    return out
+
+
+def read_chunks(f, chunk_size: int):
+    """Yields (index of the first trail, lines) for each chunk of non-blank lines."""
+    index = 0
+    while True:
+        raw = list(islice(f, chunk_size))
+        if not raw:
+            return
+        lines = [line for line in raw if line.strip()]
+        if lines:
+            yield index, lines
+        index += len(lines)
+
+
+def ingest(infile, outfile, query: str, k: int = 1, personality: str = "lazy", workers: int | None = None, chunk_size: int = 1000, in_flight: int | None = None) -> None:
+    """
+    Stream trails from infile through the query, writing JSONL results to outfile.
+
+    :raises ValueError: when chunk_size or in_flight is less than 1.
+    """
+    if chunk_size < 1 or (in_flight is not None and in_flight < 1):
+        raise ValueError("chunk_size and in_flight must be at least 1")
+    if in_flight is None:
+        in_flight = 2 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, lines in read_chunks(infile, chunk_size):
+            # Backpressure: don't read further ahead than in_flight chunks.
+            if len(pending) >= in_flight:
+                outfile.writelines(line + "\n" for line in pending.popleft().result())
+            pending.append(pool.submit(process_chunk, start, lines, query, k, personality))
+        while pending:
+            outfile.writelines(line + "\n" for line in pending.popleft().result())
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Run a query over every trail in a JSONL file.")
+    p.add_argument("input", help="JSONL file with one serialized trail per line, or - for stdin.")
+    p.add_argument("output", help="JSONL file to write results to, or - for stdout.", nargs="?", default="-")
+    p.add_argument("--query", help="Query to run on each trail.", choices=["mountains", "route", "paths"], default="mountains")
+    p.add_argument("--k", help="Path length for the paths query.", type=int, default=1)
+    p.add_argument("--personality", help="Walker for the route query.", choices=list(PERSONALITIES), default="lazy")
+    p.add_argument("--workers", help="Number of worker processes. Defaults to all cores.", type=positive_int, default=None)
+    p.add_argument("--chunk-size", help="Lines per chunk handed to a worker.", type=positive_int, default=1000)
+    p.add_argument("--in-flight", help="Maximum number of chunks pending at once.", type=positive_int, default=None)
+    args = p.parse_args()
+
+    infile = sys.stdin if args.input == "-" else open(args.input, "r")
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        ingest(infile, outfile, args.query, args.k, args.personality, args.workers, args.chunk_size, args.in_flight)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
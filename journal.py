@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+
+from mountain import Mountain
+from trail import Trail
+from serialize import read_store, write_store
+
+
+class TrailJournal:
+    """
+    Append-only edit journal sitting next to a base snapshot of a trail.
+
+    Every edit is recorded as a small JSON line addressing the Trail it was
+    applied to by its path from the root (the attribute names followed from
+    each store, e.g. ["following", "path_top"]). Saving only appends the edits
+    made since the last save, so save latency is proportional to the change
+    rather than to the size of the trail.
+
+    Loading reads the snapshot and replays the journal on top of it.
+    Compaction rewrites the snapshot and truncates the journal, and runs
+    automatically once the journal holds COMPACT_THRESHOLD records.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    JOURNAL_SUFFIX = ".journal"
+    COMPACT_THRESHOLD = 256
+
+    def __init__(self, snapshot_path: str) -> None:
+        """
+        Create a journal for the snapshot stored at snapshot_path.
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + self.JOURNAL_SUFFIX
+        self.pending = []
+        self.journal_length = 0
+
+    def record(self, path: tuple[str, ...], op: str, mountain: Mountain | None = None) -> None:
+        """
+        Record an edit, to be written on the next flush.
+
+        op is the name of the trail edit method that was applied to the
+        Trail at path, or "edit_mountain" when the mountain at path was
+        changed in place. mountain is the mountain argument (or the new
+        mountain values for an edit), if the operation takes one.
+        """
+        entry = {"path": list(path), "op": op}
+        if mountain is not None:
+            entry["mountain"] = dataclasses.asdict(mountain)
+        self.pending.append(entry)
+
+    def flush(self) -> None:
+        """
+        Append all pending records to the journal file.
+
+        :complexity: O(P) where P is the number of pending records.
+        """
+        if not self.pending:
+            return
+        with open(self.journal_path, "a") as f:
+            for entry in self.pending:
+                f.write(json.dumps(entry) + "\n")
+        self.journal_length += len(self.pending)
+        self.pending = []
+
+    def save(self, trail: Trail) -> None:
+        """
+        Persist all edits made since the last save, compacting when the
+        journal has grown past COMPACT_THRESHOLD records.
+
+        :complexity: O(P) where P is the number of pending records,
+        O(N) when a compaction is triggered, where N is the size of the trail.
+        """
+        if not os.path.exists(self.snapshot_path):
+            self.compact(trail)
+            return
+        self.flush()
+        if self.journal_length >= self.COMPACT_THRESHOLD:
+            self.compact(trail)
+
+    def compact(self, trail: Trail) -> None:
+        """
+        Write the full trail as the new snapshot and truncate the journal.
+
+        :complexity: O(N) where N is the size of the trail.
+        """
+        write_store(trail, self.snapshot_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.pending = []
+        self.journal_length = 0
+
+    def load(self) -> Trail:
+        """
+        Read the snapshot and replay the journal on top of it.
+        A partial last record, left by a crash while appending, is ignored and removed.
+
+        :complexity: O(N + J*D) where N is the size of the snapshot,
+        J the number of journal records and D the depth of the trail.
+        """
+        trail = read_store(self.snapshot_path)
+        self.pending = []
+        self.journal_length = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                data = f.read()
+            # A record is only complete once its newline is written. Anything after the
+            # last newline was cut short by a crash, so drop it, and truncate it away
+            # so that later records aren't appended onto it.
+            complete = data[:data.rfind(b"\n") + 1]
+            if len(complete) < len(data):
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(len(complete))
+            for line in complete.decode("utf-8").splitlines():
+                if line.strip():
+                    trail = apply_entry(trail, json.loads(line))
+                    self.journal_length += 1
+        return trail
+
+
+def apply_entry(trail: Trail, entry: dict) -> Trail:
+    """
+    Apply a single journal record to trail, returning the (possibly new) root.
+
+    :complexity: O(D) where D is the length of the record's path.
+    """
+    parent, attribute = None, None
+    target = trail
+    for step in entry["path"]:
+        parent, attribute = target.store, step
+        target = getattr(target.store, step)
+
+    op = entry["op"]
+    args = [Mountain(**entry["mountain"])] if "mountain" in entry else []
+
+    if op == "edit_mountain":
+        new = args[0]
+        target.store.mountain.name = new.name
+        target.store.mountain.difficulty_level = new.difficulty_level
+        target.store.mountain.length = new.length
+    elif target.store is None:
+        # Edits on an empty trail replace the trail itself within its parent.
+        new_trail = getattr(target, op)(*args)
+        if parent is None:
+            return new_trail
+        setattr(parent, attribute, new_trail)
+    else:
+        target.store = getattr(target.store, op)(*args)
+    return trail
@@ -1,6 +1,5 @@
 import arcade
 import arcade.gui as gui
-import json
 import sys
 import secrets
 from copy import copy
@@ -8,11 +7,11 @@ from copy import copy
 from constants import DrawMode
 from mountain import Mountain
 from mountain_manager import MountainManager
-from trail import Trail, TrailSeries, TrailSplit
+from trail import Trail
 from draw_trails import TrailDraw
-from mountain_organiser import MountainOrganiser
-from double_key_table import DoubleKeyTable
-from serialize import serialize, deserialize
+from mountain_organiser import FenwickOrganiser
+from journal import TrailJournal
+from trail_events import trail_changes
 
 class MyWindow(arcade.Window):
     """ Painter Window """
@@ -271,16 +270,19 @@ class MyWindow(arcade.Window):
     def setup(self) -> None:
         """Set up the game and initialize the variables."""
         self.reset()
+        if hasattr(self, "mountain_manager"):
+            trail_changes.unsubscribe(self.mountain_manager.on_trail_change)
         self.mountain_manager = MountainManager()
         self.cur_filename = sys.argv[1] if len(sys.argv) > 1 else "basic.json"
-        with open(f"stores/{self.cur_filename}", "r") as f:
-            t = deserialize(json.loads(f.read()))
+        self.journal = TrailJournal(f"stores/{self.cur_filename}")
+        t = self.journal.load()
         try:
             # Try to add all existing mountains
-            for mountain in t.collect_all_mountains():
-                self.mountain_manager.add_mountain(mountain)
+            self.mountain_manager.add_mountains(t.collect_all_mountains())
         except NotImplementedError:
             pass
+        # From here on, trail edits keep the manager up to date.
+        trail_changes.subscribe(self.mountain_manager.on_trail_change)
         self.mountain = TrailDraw(t)
         self.draw_box = None
 
@@ -333,21 +335,16 @@ class MyWindow(arcade.Window):
                         key = secrets.token_hex(2)
                         mountain = Mountain(f"default-{key}", 0, 0)
                         self.box_action(mountain)
-                        try:
-                            self.mountain_manager.add_mountain(mountain)
-                        except NotImplementedError:
-                            pass
+                        self.journal.record(self.box_action.path, self.box_action.op, mountain)
                     elif self.cur_draw_mode == DrawMode.ADD_BRANCH:
                         self.box_action()
+                        self.journal.record(self.box_action.path, self.box_action.op)
                     elif self.cur_draw_mode == DrawMode.REMOVE:
-                        if isinstance(self.cur_trail, TrailSeries):
-                            try:
-                                self.mountain_manager.remove_mountain(self.cur_trail.mountain)
-                            except NotImplementedError:
-                                pass
                         self.box_action()
+                        self.journal.record(self.box_action.path, self.box_action.op)
                     elif self.cur_draw_mode == DrawMode.EDIT:
                         self.cur_editing_mountain = self.box_action()
+                        self.cur_editing_path = self.box_action.path
                         self.input_mountain_name.text = self.cur_editing_mountain.name
                         self.input_difficulty_level.text = str(self.cur_editing_mountain.difficulty_level)
                         self.input_length.text = str(self.cur_editing_mountain.length)
@@ -385,25 +382,15 @@ class MyWindow(arcade.Window):
                 for x in colorsys.hls_to_rgb(index/total, 0.6, 0.6)
             ]
         groups = self.mountain_manager.group_by_difficulty()
-        to = MountainOrganiser()
-        positions = DoubleKeyTable()
-        positions.hash1 = lambda k: (k % positions.table_size)
-        all_mountains = []
-        for i, group in enumerate(groups):
-            to.add_mountains(group)
-            for mountain in group:
-                positions[mountain.difficulty_level, mountain.name] = []
-            all_mountains.extend(group)
-            for mountain in all_mountains:
-                positions[mountain.difficulty_level, mountain.name].append(to.cur_position(mountain))
+        histories = FenwickOrganiser.rank_history(groups)
         self.graph_data = [
             [
-                get_col(i, len(all_mountains)),
-                len(groups) - len(positions[mountain.difficulty_level, mountain.name]),
+                get_col(i, len(histories)),
+                start_index,
                 mountain.name,
-                positions[mountain.difficulty_level, mountain.name]
+                positions
             ]
-            for i, mountain in enumerate(all_mountains)
+            for i, (mountain, start_index, positions) in enumerate(histories)
         ]
 
     def on_save_file_clicked(self):
@@ -448,6 +435,7 @@ class MyWindow(arcade.Window):
             self.mountain_manager.edit_mountain(old_mountain, self.cur_editing_mountain)
         except NotImplementedError:
             pass
+        self.journal.record(self.cur_editing_path, "edit_mountain", self.cur_editing_mountain)
         # Close the window.
         self.on_close_clicked(event)
 
@@ -458,8 +446,13 @@ class MyWindow(arcade.Window):
 
     def on_file_save_clicked(self, event):
         new_path = str(self.input_file_name.text)
-        with open(f"stores/{new_path}", "w") as f:
-            f.write(serialize(self.mountain.trail))
+        if new_path == self.cur_filename:
+            # Only append the edits made since the last save.
+            self.journal.save(self.mountain.trail)
+        else:
+            self.journal = TrailJournal(f"stores/{new_path}")
+            self.journal.compact(self.mountain.trail)
+            self.cur_filename = new_path
         # Close the window.
         self.on_file_close_clicked(event)
 
@@ -1,4 +1,7 @@
 from mountain import Mountain
+from data_structures.sorted_list import BlockedSortedList
+import bisect
+import sys
 class MountainManager:
     '''
     A class that manages mountains.
@@ -11,10 +14,23 @@ class MountainManager:
     ----------
     size: int
         The size of the hash table.
+    count: int
+        The number of occupied slots (distinct difficulties) in the hash table.
     keys: list
         The keys of the hash table.
     values: list
         The values of the hash table.
+    difficulties: list
+        The distinct difficulties in the table, in ascending order.
+    handles: dict
+        Maps id(mountain) to the (difficulty, index) of its slot in the bucket,
+        so that a mountain can be removed without scanning its bucket.
+    names: dict | None
+        Optional hash index from name to the mountains with that name.
+    lengths: BlockedSortedList | None
+        Optional sorted index of the distinct mountain lengths.
+    length_mountains: dict | None
+        Maps each indexed length to the mountains with that length.
 
     Methods
     -------
@@ -24,8 +40,34 @@ class MountainManager:
         Rehashes the previous hash and returns the new hash value.
     add_mountain(mountain)
         Add a mountain to the manager.
+    add_mountains(mountains)
+        Add many mountains to the manager at once.
     remove_mountain(mountain)
-        Remove a mountain from the manager  
+        Remove a mountain from the manager
+    remove_mountains(mountains)
+        Remove many mountains from the manager at once.
+    on_trail_change(change)
+        Apply a TrailChange published by the trail edit methods.
+    mountains_between(lo, hi)
+        All mountains with difficulty in [lo, hi].
+    easiest_difficulties(k)
+        The k lowest difficulties in the manager.
+    mountains_named(name)
+        All mountains with this name (requires the name index).
+    mountains_with_length_between(lo, hi)
+        All mountains with length in [lo, hi] (requires the length index).
+    index_memory()
+        The memory used by the secondary indexes.
+    snapshot()
+        A read-only, consistent view of the manager sharing its buckets.
+    group_views()
+        All mountains grouped by difficulty, as views into one contiguous array.
+    iter_groups()
+        Stream the difficulty groups in ascending order.
+
+    The table grows when more than MAX_LOAD of its slots are occupied and
+    shrinks when fewer than MIN_LOAD are, so it never fills up and probe
+    chains stay short.
 
     Complexity
     ----------
@@ -34,130 +76,540 @@ class MountainManager:
 
     '''
 
-    
+    MAX_LOAD = 2 / 3
+    MIN_LOAD = 1 / 6
+    MIN_SIZE = 10
+
+
     def hash(self, key):
         '''
         Hashes the key and returns the hash value.
-        
+
         Best Case Complexity: O(1)
         Worst Case Complexity: O(1)
         '''
-        return key % self.size 
+        return key % self.size
 
     def rehash(self, previous_hash):
         '''
         Rehashes the previous hash and returns the new hash value.
 
-        Best Case Complexity: O(1) 
+        Best Case Complexity: O(1)
         Worst Case Complexity: O(1)
         '''
         return (previous_hash + 1) % self.size
-    
 
-    def __init__(self, size = 10) -> None:
+
+    def __init__(self, size = 10, index_name = False, index_length = False) -> None:
         '''
-        Initializes the MountainManager with a given size.
+        Initializes the MountainManager with a given size,
+        optionally maintaining secondary indexes on name and length.
 
-        Best Case Complexity: O(1) 
-        Worst Case Complexity: O(1) 
+        Best Case Complexity: O(1)
+        Worst Case Complexity: O(1)
         '''
         self.size = size
+        self.min_size = min(size, self.MIN_SIZE)
+        self.count = 0
         self.keys = [None] * self.size
         self.values = [None] * self.size
+        self.difficulties = []
+        self.handles = {}
+        self.names = {} if index_name else None
+        self.lengths = BlockedSortedList() if index_length else None
+        self.length_mountains = {} if index_length else None
+        # The (name, length) each mountain was indexed under,
+        # as mountains may be edited in place before they are removed.
+        self.indexed_as = {}
+        # ids of buckets shared with a snapshot, which must be copied before being mutated.
+        self.shared = set()
+
+    def _probe(self, key) -> int:
+        '''
+        Returns the slot holding key, or the empty slot where it would be inserted.
+        The load factor guarantees there is always an empty slot.
+
+        Best Case Complexity: O(1) when the first slot is empty or holds key
+        Worst Case Complexity: O(size) when the table is clustered
+        '''
+        hash_value = self.hash(key)
+        while self.keys[hash_value] is not None and self.keys[hash_value] != key:
+            hash_value = self.rehash(hash_value)
+        return hash_value
+
+    def _resize(self, new_size) -> None:
+        '''
+        Move every bucket into a table of new_size slots.
+
+        Best Case Complexity: O(size + new_size)
+        Worst Case Complexity: O(size * new_size) when the new table is clustered
+        '''
+        old_keys, old_values = self.keys, self.values
+        self.size = new_size
+        self.keys = [None] * self.size
+        self.values = [None] * self.size
+        for key, bucket in zip(old_keys, old_values):
+            if key is not None:
+                hash_value = self._probe(key)
+                self.keys[hash_value] = key
+                self.values[hash_value] = bucket
+
+    def _delete_slot(self, hash_value) -> None:
+        '''
+        Empty a slot, moving later entries of its cluster back so that
+        they stay reachable by probing, and shrink the table if it is sparse.
+
+        Best Case Complexity: O(1) when the next slot is empty
+        Worst Case Complexity: O(size) when the cluster is large
+        '''
+        del self.difficulties[bisect.bisect_left(self.difficulties, self.keys[hash_value])]
+        self.keys[hash_value] = None
+        self.values[hash_value] = None
+        self.count -= 1
+        hash_value = self.rehash(hash_value)
+        while self.keys[hash_value] is not None:
+            key, bucket = self.keys[hash_value], self.values[hash_value]
+            self.keys[hash_value] = None
+            self.values[hash_value] = None
+            new_hash = self._probe(key)
+            self.keys[new_hash] = key
+            self.values[new_hash] = bucket
+            hash_value = self.rehash(hash_value)
+
+        if self.size > self.min_size and self.count < self.size * self.MIN_LOAD:
+            self._resize(max(self.min_size, self.size // 2))
+
+
+    def _own_bucket(self, hash_value):
+        '''
+        Returns the bucket at hash_value for mutation,
+        first copying it if it is shared with a snapshot.
+
+        Best Case Complexity: O(1) when the bucket isn't shared
+        Worst Case Complexity: O(k) to copy a shared bucket of k mountains
+        '''
+        bucket = self.values[hash_value]
+        if self.shared and id(bucket) in self.shared:
+            self.shared.discard(id(bucket))
+            bucket = list(bucket)
+            self.values[hash_value] = bucket
+        return bucket
 
+    def snapshot(self):
+        '''
+        Returns a read-only, consistent view of the manager.
+        The view shares its buckets with the manager, and a bucket is only copied
+        when the manager next mutates it, so taking a snapshot never copies mountains.
+        Mountains edited in place are still seen by the view.
+
+        Best Case Complexity: O(size + D)
+        Worst Case Complexity: O(size + D)
+        '''
+        self.shared = set(id(bucket) for bucket in self.values if bucket is not None)
+        return MountainManagerSnapshot(self)
 
     def add_mountain(self, mountain: Mountain):
         '''
         Add a mountain to the manager.
-        
+
         Best Case Complexity: O(1) when the first slot is empty
         Worst Case Complexity: O(n) when the first slot is full
         '''
         key = mountain.difficulty_level
-        hash_value = self.hash(key)
-
-        # If the slot is not empty, rehash until we find an empty slot
-        while self.keys[hash_value] is not None and self.keys[hash_value] != key:
-            hash_value = self.rehash(hash_value)
+        hash_value = self._probe(key)
 
         if self.keys[hash_value] is None:
             self.keys[hash_value] = key
             self.values[hash_value] = [mountain]
+            self.handles[id(mountain)] = (key, 0)
+            self._index_add(mountain)
+            self.count += 1
+            bisect.insort(self.difficulties, key)
+            if self.count > self.size * self.MAX_LOAD:
+                self._resize(2 * self.size + 1)
         else:
-            self.values[hash_value].append(mountain)
+            bucket = self._own_bucket(hash_value)
+            self.handles[id(mountain)] = (key, len(bucket))
+            bucket.append(mountain)
+            self._index_add(mountain)
+
+    def add_mountains(self, mountains):
+        '''
+        Add many mountains to the manager at once.
+        The mountains are grouped by difficulty first, so the table is resized
+        at most once and each bucket is extended with a single append.
+
+        Best Case Complexity: O(n + D log D) where n is the number of mountains added
+        and D the number of distinct difficulties
+        Worst Case Complexity: O(n + D log D), plus O(L log L + min(L log N, N + L)) for the
+        length index, where L is the number of new lengths and N the number already indexed
+        '''
+        groups = {}
+        for mountain in mountains:
+            groups.setdefault(mountain.difficulty_level, []).append(mountain)
+
+        new_keys = [key for key in groups if self.keys[self._probe(key)] is None]
+        new_lengths = [] if self.lengths is not None else None
+        needed = self.count + len(new_keys)
+        if needed > self.size * self.MAX_LOAD:
+            new_size = self.size
+            while needed > new_size * self.MAX_LOAD:
+                new_size = 2 * new_size + 1
+            self._resize(new_size)
+
+        for key, group in groups.items():
+            hash_value = self._probe(key)
+            if self.keys[hash_value] is None:
+                self.keys[hash_value] = key
+                self.values[hash_value] = []
+                self.count += 1
+            bucket = self._own_bucket(hash_value)
+            for index, mountain in enumerate(group, len(bucket)):
+                self.handles[id(mountain)] = (key, index)
+                self._index_add(mountain, new_lengths)
+            bucket.extend(group)
+
+        if new_lengths:
+            # Merged into the length index in one pass, rather than inserted one by one.
+            self.lengths.update(new_lengths)
+
+        if new_keys:
+            self.difficulties = sorted(self.difficulties + new_keys)
+
+    def _index_add(self, mountain: Mountain, new_lengths=None):
+        '''
+        Add a mountain to the secondary indexes that are enabled.
+        If new_lengths is given, a length not yet indexed is appended to it for the
+        caller to add to the length index, instead of being added straight away.
+
+        Best Case Complexity: O(1) when its length is already indexed
+        Worst Case Complexity: O(log n) to add its length to the length index
+        '''
+        if self.names is None and self.lengths is None:
+            return
+        self.indexed_as[id(mountain)] = (mountain.name, mountain.length)
+        if self.names is not None:
+            self.names.setdefault(mountain.name, []).append(mountain)
+        if self.lengths is not None:
+            same_length = self.length_mountains.get(mountain.length)
+            if same_length is None:
+                self.length_mountains[mountain.length] = [mountain]
+                if new_lengths is None:
+                    self.lengths.add(mountain.length)
+                else:
+                    new_lengths.append(mountain.length)
+            else:
+                same_length.append(mountain)
+
+    def _index_remove(self, mountain: Mountain):
+        '''
+        Remove a mountain from the secondary indexes that are enabled.
+
+        Best Case Complexity: O(log n) when no other mountain shares its name or length
+        Worst Case Complexity: O(log n + d) where d is the number of mountains sharing its name or length
+        '''
+        if self.names is None and self.lengths is None:
+            return
+        indexed = self.indexed_as.pop(id(mountain), None)
+        if indexed is None:
+            return
+        name, length = indexed
+        if self.names is not None:
+            same_name = self.names[name]
+            for i, other in enumerate(same_name):
+                if other is mountain:
+                    del same_name[i]
+                    break
+            if not same_name:
+                del self.names[name]
+        if self.lengths is not None:
+            same_length = self.length_mountains[length]
+            for i, other in enumerate(same_length):
+                if other is mountain:
+                    del same_length[i]
+                    break
+            if not same_length:
+                del self.length_mountains[length]
+                self.lengths.remove(length)
+
+    def _remove_handle(self, mountain: Mountain, key, index):
+        '''
+        Remove the exact mountain object stored at index of the bucket for key,
+        by moving the last mountain of the bucket into its place.
+
+        Best Case Complexity: O(1)
+        Worst Case Complexity: O(1) when the table isn't clustered
+        '''
+        hash_value = self._probe(key)
+        bucket = self._own_bucket(hash_value)
+        last = bucket.pop()
+        if index < len(bucket):
+            bucket[index] = last
+            self.handles[id(last)] = (key, index)
+        # An equal mountain found by scanning may have no handle of its own.
+        self.handles.pop(id(mountain), None)
+        self._index_remove(mountain)
+        if len(bucket) == 0:
+            self._delete_slot(hash_value)
 
     def remove_mountain(self, mountain: Mountain):
         '''
-        Remove a mountain from the manager
-        
-        Best Case Complexity: O(1) when the mountain is the first element in the list
-        Worst Case Complexity: O(n) when the mountain is the last element in the list
+        Remove a mountain from the manager.
+        If this exact mountain object isn't in the manager, an equal mountain is removed instead.
+
+        Best Case Complexity: O(1) when the mountain object is in the manager
+        Worst Case Complexity: O(k) when only an equal mountain is, where k is the size of its bucket
         '''
+        handle = self.handles.get(id(mountain))
+        if handle is not None:
+            self._remove_handle(mountain, *handle)
+            return
 
-      
         key = mountain.difficulty_level
-        hash_value = self.hash(key)
-       
-        # If the slot is not empty, rehash until we find the mountain
-        while self.keys[hash_value] is not None: 
-            if self.keys[hash_value] == key:
-                self.values[hash_value].remove(mountain)
-                if len(self.values[hash_value]) == 0:
-                    self.keys[hash_value] = None
-                    self.values[hash_value] = None
-                return
-            hash_value = self.rehash(hash_value)
+        hash_value = self._probe(key)
+        if self.keys[hash_value] is not None:
+            for index, other in enumerate(self.values[hash_value]):
+                if other == mountain:
+                    self._remove_handle(other, key, index)
+                    return
 
-        
+    def remove_mountains(self, mountains):
+        '''
+        Remove many mountains from the manager at once, such as a whole removed branch.
 
+        Best Case Complexity: O(k) where k is the number of mountains removed
+        Worst Case Complexity: O(k * b) when they must be found by equality, in buckets of size b
+        '''
+        for mountain in mountains:
+            self.remove_mountain(mountain)
 
-        
+    def on_trail_change(self, change):
+        '''
+        Keep the manager in sync with a trail, by applying a TrailChange
+        published by the trail edit methods. Subscribe it with
+        `trail_events.trail_changes.subscribe(manager.on_trail_change)`.
+        The publisher is shared by all trails, so the manager then follows
+        edits to every trail, not just the one it was loaded from.
+
+        Best Case Complexity: O(a + r) where a and r are the numbers of mountains added and removed
+        Worst Case Complexity: See add_mountains and remove_mountains.
+        '''
+        if change.added:
+            self.add_mountains(change.added)
+        if change.removed:
+            self.remove_mountains(change.removed)
 
     def edit_mountain(self, old: Mountain, new: Mountain):
         '''
         Remove the old mountain and add the new mountain.
-        
-        Best Case Complexity: O(1) when the mountain is the first element in the list
-        Worst Case Complexity: O(n) when the mountain is the last element in the list
-        '''
+        new may be the same object as the stored mountain, edited in place,
+        in which case it is found through its handle rather than by old.
 
-        self.remove_mountain(old) 
+        Best Case Complexity: O(1)
+        Worst Case Complexity: O(k) when the stored mountain must be found by equality
+        '''
+        handle = self.handles.get(id(new))
+        if handle is not None:
+            self._remove_handle(new, *handle)
+        else:
+            self.remove_mountain(old)
         self.add_mountain(new)
-        
-
 
     def mountains_with_difficulty(self, diff: int):
         '''
         Return a list of all mountains with this difficulty.
-        
-        Best Case Complexity: O(1) when the first slot is empty
-        Worst Case Complexity: O(n) when the first slot is full
+
+        Best Case Complexity: O(1 + k) where k is the number of mountains returned
+        Worst Case Complexity: O(size + k) when the table is clustered
+        '''
+        hash_value = self._probe(diff)
+        if self.keys[hash_value] is None:
+            return []
+        return list(self.values[hash_value])
+
+    def mountains_between(self, lo: int, hi: int):
+        '''
+        Return a list of all mountains with difficulty between lo and hi (inclusive),
+        in ascending order of difficulty.
+
+        Best Case Complexity: O(log D + k) where D is the number of distinct difficulties
+        and k is the number of mountains returned
+        Worst Case Complexity: O(log D + k)
         '''
-        
         result = []
+        start = bisect.bisect_left(self.difficulties, lo)
+        end = bisect.bisect_right(self.difficulties, hi)
+        for diff in self.difficulties[start:end]:
+            result.extend(self.values[self._probe(diff)])
+        return result
+
+    def easiest_difficulties(self, k: int):
+        '''
+        Return the k lowest difficulties in the manager, in ascending order.
+
+        Best Case Complexity: O(k)
+        Worst Case Complexity: O(k)
+        '''
+        return self.difficulties[:k]
+
+    def mountains_named(self, name: str):
+        '''
+        Return a list of all mountains with this name.
 
-        for i in range(self.size):
-            if self.keys[i] is not None:
-                for mountain in self.values[i]:
-                    if mountain.difficulty_level == diff:
-                        result.append(mountain)
+        :raises ValueError: when the manager has no name index.
+        Best Case Complexity: O(1 + k) where k is the number of mountains returned
+        Worst Case Complexity: O(1 + k)
+        '''
+        if self.names is None:
+            raise ValueError("MountainManager was created without a name index.")
+        return list(self.names.get(name, []))
+
+    def mountains_with_length_between(self, lo: int, hi: int):
+        '''
+        Return a list of all mountains with length between lo and hi (inclusive),
+        in ascending order of length.
+
+        :raises ValueError: when the manager has no length index.
+        Best Case Complexity: O(log n + k) where k is the number of mountains returned
+        Worst Case Complexity: O(log n + k)
+        '''
+        if self.lengths is None:
+            raise ValueError("MountainManager was created without a length index.")
+        result = []
+        start = self.lengths.bisect_left(lo)
+        end = self.lengths.bisect_right(hi)
+        for length in self.lengths.islice(start, end):
+            result.extend(self.length_mountains[length])
         return result
 
-        
-    
+    def index_memory(self):
+        '''
+        Return the number of bytes used by each enabled secondary index,
+        not counting the mountains themselves.
 
-       
+        Best Case Complexity: O(1) when the name index is disabled
+        Worst Case Complexity: O(N) where N is the number of distinct names
+        '''
+        memory = {}
+        if self.names is not None:
+            memory["name"] = sys.getsizeof(self.names) + sum(sys.getsizeof(same_name) for same_name in self.names.values())
+        if self.lengths is not None:
+            lengths = self.lengths
+            memory["length"] = (
+                sys.getsizeof(lengths.blocks) + sum(sys.getsizeof(block) for block in lengths.blocks)
+                + sys.getsizeof(lengths.maxes) + sys.getsizeof(lengths.tree)
+                + sys.getsizeof(self.length_mountains)
+                + sum(sys.getsizeof(same_length) for same_length in self.length_mountains.values())
+            )
+        if memory:
+            memory["indexed_as"] = sys.getsizeof(self.indexed_as)
+        return memory
 
     def group_by_difficulty(self):
         '''
         Returns a list of lists of all mountains, grouped by and sorted by ascending difficulty.
-        
-        Best Case Complexity: O(n) when the first slot is empty
-        Worst Case Complexity: O(n) when the first slot is full
+
+        Best Case Complexity: O(n) where n is the number of mountains
+        Worst Case Complexity: O(n)
         '''
-        
-        groups = [[] for _ in range(self.size)]
-        for i in range(self.size):
-            if self.keys[i] is not None:
-                groups[self.keys[i]].extend(self.values[i])
-        return [sorted(group, key=lambda m: m.difficulty_level) for group in groups if group]
\ No newline at end of file
+        return [list(group) for group in self.iter_groups()]
+
+    def iter_groups(self):
+        '''
+        Yields the mountains of each difficulty in ascending order of difficulty,
+        without materialising the other groups. Each group is a read-only GroupView
+        of its bucket, so callers can't change the manager, or a snapshot sharing the
+        bucket, through it. The manager must not be mutated while iterating; iterate
+        over a snapshot() to allow that.
+
+        Best Case Complexity: O(1) per group, plus O(k) for each group of k mountains consumed
+        Worst Case Complexity: O(n) overall
+        '''
+        for diff in list(self.difficulties):
+            bucket = self.values[self._probe(diff)]
+            yield GroupView(bucket, 0, len(bucket))
+
+    def group_views(self):
+        '''
+        Returns all mountains grouped by and sorted by ascending difficulty,
+        as GroupViews into one contiguous, difficulty-ordered list.
+
+        The buckets are already partitioned by difficulty and the difficulty
+        index is kept in order, so this is a counting-sort placement:
+        the group offsets are prefix sums of the bucket sizes, and no
+        mountains are compared.
+
+        Best Case Complexity: O(n + D)
+        Worst Case Complexity: O(n + D)
+        '''
+        ordered = []
+        bounds = []
+        for group in self.iter_groups():
+            start = len(ordered)
+            ordered.extend(group)
+            bounds.append((start, len(ordered)))
+        return [GroupView(ordered, start, stop) for start, stop in bounds]
+
+
+
+class GroupView:
+    '''
+    A read-only view of ordered[start:stop], for one difficulty group.
+    Many views share the same underlying list, so grouping doesn't allocate a list per group.
+    '''
+
+    __slots__ = ("ordered", "start", "stop")
+
+    def __init__(self, ordered: list, start: int, stop: int) -> None:
+        self.ordered = ordered
+        self.start = start
+        self.stop = stop
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, index: int) -> Mountain:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.ordered[self.start + index]
+
+    def __iter__(self):
+        for i in range(self.start, self.stop):
+            yield self.ordered[i]
+
+    @property
+    def difficulty(self) -> int:
+        return self.ordered[self.start].difficulty_level
+
+
+class MountainManagerSnapshot(MountainManager):
+    '''
+    A read-only view of a MountainManager at the time it was taken.
+    Supports the same queries as MountainManager, except those
+    on the secondary indexes. Mutating it raises a TypeError.
+    '''
+
+    def __init__(self, manager: MountainManager) -> None:
+        '''
+        Take a view of manager, sharing its buckets.
+
+        Best Case Complexity: O(size + D)
+        Worst Case Complexity: O(size + D)
+        '''
+        self.size = manager.size
+        self.count = manager.count
+        self.keys = list(manager.keys)
+        self.values = list(manager.values)
+        self.difficulties = list(manager.difficulties)
+        self.names = None
+        self.lengths = None
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("A MountainManager snapshot is read-only.")
+
+    add_mountain = add_mountains = remove_mountain = remove_mountains = edit_mountain = on_trail_change = _read_only
+
+    def snapshot(self):
+        return self
@@ -2,9 +2,28 @@ from __future__ import annotations
 
 from mountain import Mountain
 from typing import List
+from data_structures.sorted_list import BlockedSortedList
+from array import array
 import bisect
 
-#What is bisect? -> bisect module provides support for maintaining a list in sorted order without having to sort the list after each insertion. For long lists of items with expensive comparison operations, this can be an improvement over the more common approach. The module is called bisect because it uses a basic bisection algorithm to do its work. The source code may be most useful as a working example of the algorithm (the boundary conditions are already right!).
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, ColumnarOrganiser falls back to array('q') columns.
+    np = None
+
+# BlockedSortedList keeps the (length, name) keys in short sorted blocks, so inserting only shifts
+# one block rather than the whole list, and ranks come from a Fenwick tree over the block lengths.
+
+class _AfterAllNames:
+    '''Compares greater than every name, so (length, _AFTER_ALL_NAMES) sorts after every key with that length.'''
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+_AFTER_ALL_NAMES = _AfterAllNames()
 
 class MountainOrganiser:
     '''
@@ -12,7 +31,8 @@ class MountainOrganiser:
 
     === Attributes ===
     
-    mountains: a list of mountains in the organiser
+    mountains: a BlockedSortedList of the (length, name) keys of the mountains in the organiser
+    by_key: maps each (length, name) key to the mountains in the organiser with that key
     mountain: a mountain in the organiser
     pos : the position of the mountain in the organiser
     '''
@@ -22,7 +42,8 @@ class MountainOrganiser:
         Creates a new MountainOrganiser
         Time Complexity: O(1)
         '''
-        self.mountains = [] 
+        self.mountains = BlockedSortedList()
+        self.by_key = {}
 
 
 
@@ -35,7 +56,7 @@ class MountainOrganiser:
         Best Time Complexity: O(1) where n is the number of mountains in the organiser, when n is 0
         '''
 
-        pos = bisect.bisect_left(self.mountains, (mountain.length, mountain.name)) #pos is the position where the mountain should be inserted
+        pos = self.mountains.bisect_left((mountain.length, mountain.name)) #pos is the position where the mountain should be inserted
         if pos != len(self.mountains) and self.mountains[pos] == (mountain.length, mountain.name): #if the mountain is already in the organiser, return the position
             return pos
         
@@ -47,11 +68,90 @@ class MountainOrganiser:
         Adds a list of mountain to the organiser 
         add_mountains should have complexity at most 
 
-        Worst time Complexity: O(n log n) where n is the number of mountains in the organiser, when n is not 0
-        Best Time Complexity: O(n) where n is the number of mountains in the organiser, when n is 0
+        The group is sorted once and, when it is large, merged with the organiser in a single pass.
+
+        Worst time Complexity: O(m log m + min(m log n, n + m)) where m is the number of mountains added and n the number in the organiser
+        Best Time Complexity: O(m) when the group is already sorted and the organiser is empty
+        '''
+        self.mountains.update((mountain.length, mountain.name) for mountain in mountains)
+        for mountain in mountains:
+            self.by_key.setdefault((mountain.length, mountain.name), []).append(mountain)
+
+    def select(self, k: int) -> Mountain:
+        '''
+        Returns the mountain at position k, i.e. the k-th shortest mountain (from 0).
+
+        :raises IndexError: when k is negative or not less than the number of mountains.
+        Time Complexity: O(log n)
+        '''
+        if not 0 <= k < len(self.mountains):
+            raise IndexError("Position out of range")
+        key = self.mountains[k]
+        return self.by_key[key][k - self.mountains.bisect_left(key)]
+
+    def count_range(self, lo: int, hi: int) -> int:
+        '''
+        Returns the number of mountains with length between lo and hi (inclusive).
+
+        Time Complexity: O(log n)
+        '''
+        if lo > hi:
+            return 0
+        return self.mountains.bisect_right((hi, _AFTER_ALL_NAMES)) - self.mountains.bisect_left((lo,))
+
+    def remove(self, mountain: Mountain) -> None:
+        '''
+        Removes a mountain from the organiser.
+        If this exact mountain object isn't in the organiser, an equal copy of it is removed instead.
+        A mountain edited in place is stored under its old key, so must be removed with update(old, new).
+
+        :raises KeyError: when neither the mountain nor an equal copy is in the organiser under its key.
+        Time Complexity: O(log n + d) where d is the number of mountains sharing its length and name
         '''
-        for mountain in mountains: #for each mountain in the list, insert it into the organiser
-            bisect.insort(self.mountains, (mountain.length, mountain.name))
+        key = (mountain.length, mountain.name)
+        same_key = self.by_key.get(key, [])
+        index = next((i for i, other in enumerate(same_key) if other is mountain), None)
+        if index is None:
+            index = next((i for i, other in enumerate(same_key) if other == mountain), None)
+        if index is None:
+            raise KeyError("Mountain not found")
+        self.mountains.remove(key)
+        del same_key[index]
+        if not same_key:
+            del self.by_key[key]
+
+    def update(self, old: Mountain, new: Mountain) -> None:
+        '''
+        Replaces old with new, such as after a mountain has been edited.
+        old holds the values the mountain was added with, and new may be the same mountain edited in place.
+
+        :raises KeyError: when no mountain with the length and name of old is in the organiser.
+        Time Complexity: O(log n + d)
+        '''
+        key = (old.length, old.name)
+        same_key = self.by_key.get(key, [])
+        index = next((i for i, other in enumerate(same_key) if other is new), None)
+        if index is not None:
+            # new was edited in place, so remove it under its old key.
+            self.mountains.remove(key)
+            del same_key[index]
+            if not same_key:
+                del self.by_key[key]
+        else:
+            self.remove(old)
+        self.add_mountains([new])
+
+    def on_trail_change(self, change) -> None:
+        '''
+        Keep the organiser in sync with a trail, by applying a TrailChange
+        published by the trail edit methods.
+
+        Time Complexity: O((a + r) log n) where a and r are the numbers of mountains added and removed
+        '''
+        if change.added:
+            self.add_mountains(change.added)
+        for mountain in change.removed:
+            self.remove(mountain)
 
 
 
@@ -60,3 +160,316 @@ class MountainOrganiser:
         
 
         
+
+
+class FenwickOrganiser:
+    '''
+    A MountainOrganiser for when every mountain that will be added is known up front,
+    such as when charting the ranks of all mountains of a trail.
+
+    All (length, name) keys are sorted once, and a Fenwick tree over those sorted
+    slots records which mountains have been added, so a rank is a prefix sum.
+
+    === Attributes ===
+
+    keys: the sorted (length, name) keys of every mountain that may be added
+    tree: Fenwick tree counting the added mountains in each slot of keys
+    slots: maps id(mountain) to its slot in keys
+    starts: the first slot of keys holding the same key as each slot
+    added: the mountains added so far, in the order they were added
+    '''
+
+    def __init__(self, mountains: list[Mountain]) -> None:
+        '''
+        Creates an empty organiser which can hold the given mountains.
+        Time Complexity: O(n log n) where n is the number of mountains
+        '''
+        self.keys = sorted((mountain.length, mountain.name) for mountain in mountains)
+        self.tree = [0] * len(self.keys)
+        self.slots = {}
+        self.added = []
+        # The first slot holding each slot's key, as equal keys share a position.
+        self.starts = list(range(len(self.keys)))
+        for slot in range(1, len(self.keys)):
+            if self.keys[slot] == self.keys[slot - 1]:
+                self.starts[slot] = self.starts[slot - 1]
+        next_slot = {}
+        for mountain in mountains:
+            key = (mountain.length, mountain.name)
+            slot = next_slot.get(key)
+            if slot is None:
+                slot = bisect.bisect_left(self.keys, key)
+            self.slots[id(mountain)] = slot
+            next_slot[key] = slot + 1
+
+    def _add(self, slot: int) -> None:
+        '''
+        Time Complexity: O(log n)
+        '''
+        while slot < len(self.tree):
+            self.tree[slot] += 1
+            slot |= slot + 1
+
+    def _prefix(self, slot: int) -> int:
+        '''
+        Number of mountains added to the slots before slot.
+        Time Complexity: O(log n)
+        '''
+        total = 0
+        while slot > 0:
+            total += self.tree[slot - 1]
+            slot &= slot - 1
+        return total
+
+    def add_mountains(self, mountains: list[Mountain]) -> None:
+        '''
+        Adds a list of mountains to the organiser.
+
+        :raises KeyError: when a mountain wasn't given when creating the organiser.
+        Time Complexity: O(m log n) where m is the number of mountains added
+        '''
+        for mountain in mountains:
+            self._add(self.slots[id(mountain)])
+            self.added.append(mountain)
+
+    def cur_position(self, mountain: Mountain) -> int:
+        '''
+        Returns the current position of the mountain in the organiser,
+        with the same meaning as MountainOrganiser.cur_position.
+
+        :raises KeyError: when no mountain with this length and name has been added.
+        Time Complexity: O(log n)
+        '''
+        key = (mountain.length, mountain.name)
+        pos = self._prefix(bisect.bisect_left(self.keys, key))
+        if self._prefix(bisect.bisect_right(self.keys, key)) == pos:
+            raise KeyError("Mountain not found")
+        return pos
+
+    def current_positions(self) -> list[int]:
+        '''
+        Returns the current position of every added mountain, in the order they were added.
+
+        Time Complexity: O(a log n) where a is the number of mountains added so far
+        '''
+        return [self._prefix(self.starts[self.slots[id(mountain)]]) for mountain in self.added]
+
+    @classmethod
+    def rank_history(cls, groups: list[list[Mountain]]) -> list[tuple[Mountain, int, list[int]]]:
+        '''
+        Adds each group in turn, recording the position of every mountain added so far after each one.
+        Returns (mountain, index of the group it was added in, positions) for each mountain,
+        in the order they were added.
+
+        Only the mountains of a group are ranked with the Fenwick tree, when they are added.
+        A mountain already added only moves down by the number of the group's mountains
+        in earlier slots, which a single merge-style pass over the mountains in slot
+        order counts for all of them at once.
+
+        Time Complexity: O(N log N + S) where N is the number of mountains and S the total
+        length of the positions lists, i.e. the size of the output.
+        '''
+        organiser = cls([mountain for group in groups for mountain in group])
+        histories = []
+        # (start of its slot's run of equal keys, index in histories) of every mountain added, sorted.
+        by_slot = []
+        for i, group in enumerate(groups):
+            organiser.add_mountains(group)
+            group_slots = sorted(organiser.slots[id(mountain)] for mountain in group)
+            # Mountains in a slot before start have a smaller key, so each one moves those at start down.
+            moved = 0
+            for start, index in by_slot:
+                while moved < len(group_slots) and group_slots[moved] < start:
+                    moved += 1
+                positions = histories[index][2]
+                positions.append(positions[-1] + moved)
+
+            new = []
+            for mountain in group:
+                start = organiser.starts[organiser.slots[id(mountain)]]
+                new.append((start, len(histories)))
+                histories.append((mountain, i, [organiser._prefix(start)]))
+            by_slot = sorted(by_slot + new)
+        return histories
+
+
+class ColumnarOrganiser:
+    '''
+    A MountainOrganiser storing its mountains as columns of machine integers,
+    rather than as one (length, name) tuple per mountain.
+
+    Each distinct name is stored once, in sorted order, so the rank of a name orders
+    it among the others. A row stores its (length, name) as one integer key,
+    length * len(names) + the rank of its name, so that comparing keys compares
+    (length, name), ties in length included, and rows are kept sorted by key.
+    A row refers to its mountain by its handle in registry. The columns are NumPy
+    arrays when NumPy is installed, and array('q') otherwise, in which case
+    positions() falls back to bisect.
+
+    === Attributes ===
+
+    names: the distinct names in the organiser, in sorted order
+    name_ids: maps each name to its rank in names
+    registry: every mountain added, indexed by its handle
+    keys, handles: the columns, in sorted order
+    max_length: the largest absolute length added, which bounds the keys
+    '''
+
+    MAX_KEY = 2 ** 63 - 1
+
+    def __init__(self) -> None:
+        '''
+        Creates a new ColumnarOrganiser
+        Time Complexity: O(1)
+        '''
+        self.names = []
+        self.name_ids = {}
+        self.registry = []
+        self.keys = self._column([])
+        self.handles = self._column([])
+        self.max_length = 0
+
+    @staticmethod
+    def _column(values):
+        if np is not None:
+            return np.array(values, dtype=np.int64)
+        return array('q', values)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _keys(self, mountains: list[Mountain]) -> list[int]:
+        '''
+        The key of each mountain, whose name must be in the organiser.
+        Time Complexity: O(m) where m is the number of mountains
+        '''
+        count, name_ids = len(self.names), self.name_ids
+        return [mountain.length * count + name_ids[mountain.name] for mountain in mountains]
+
+    def _add_names(self, new_names: list[str]) -> None:
+        '''
+        Adds names not yet in the organiser, re-ranking all names and re-encoding every key.
+        Time Complexity: O(n + N log N) where N is the number of names
+        '''
+        old_count = len(self.names)
+        names = sorted(self.names + new_names)
+        name_ids = dict(zip(names, range(len(names))))
+        if len(self.keys):
+            # Maps the old rank of each name to its new one.
+            remap = [name_ids[name] for name in self.names]
+            if np is not None:
+                lengths, ranks = np.divmod(self.keys, old_count)
+                self.keys = lengths * len(names) + np.array(remap, dtype=np.int64)[ranks]
+            else:
+                self.keys = array('q', (key // old_count * len(names) + remap[key % old_count] for key in self.keys))
+        self.names, self.name_ids = names, name_ids
+
+    def add_mountains(self, mountains: list[Mountain]) -> None:
+        '''
+        Adds a list of mountains to the organiser.
+        The group is sorted on its own, its insertion points are found by binary search,
+        and each column is rebuilt with the group merged in, in a single pass.
+
+        :raises OverflowError: when a length is too large to encode in a key.
+        Time Complexity: O(n + m log(n + m)) where m is the number of mountains added
+        and n the number in the organiser, plus O(N log N) for N names when new names are added
+        '''
+        mountains = list(mountains)
+        if not mountains:
+            return
+        new_names = list(set(mountain.name for mountain in mountains if mountain.name not in self.name_ids))
+        # Every key, old ones included, must still fit once the new names are counted.
+        max_length = max(self.max_length, max(abs(mountain.length) for mountain in mountains))
+        if max_length >= self.MAX_KEY // (len(self.names) + len(new_names)) - 1:
+            raise OverflowError("Mountain length too large for ColumnarOrganiser")
+        self.max_length = max_length
+        if new_names:
+            self._add_names(new_names)
+
+        start = len(self.registry)
+        rows = sorted(zip(self._keys(mountains), range(start, start + len(mountains))))
+        self.registry.extend(mountains)
+        keys = [key for key, _ in rows]
+        handles = [handle for _, handle in rows]
+
+        if np is not None:
+            keys = np.array(keys, dtype=np.int64)
+            at = np.searchsorted(self.keys, keys, side="right")
+            self.keys = np.insert(self.keys, at, keys)
+            self.handles = np.insert(self.handles, at, handles)
+        else:
+            at = [bisect.bisect_right(self.keys, key) for key in keys]
+            self.keys = self._merged(self.keys, at, keys)
+            self.handles = self._merged(self.handles, at, handles)
+
+    @staticmethod
+    def _merged(column: array, at: list[int], values: list[int]) -> array:
+        '''
+        Returns a copy of column with each of values inserted before the row at the matching
+        index in at, as np.insert does. at must be in ascending order.
+        Time Complexity: O(n + m) where m is the number of values and n the length of column
+        '''
+        merged = array('q')
+        prev = 0
+        for pos, value in zip(at, values):
+            merged.extend(column[prev:pos])
+            merged.append(value)
+            prev = pos
+        merged.extend(column[prev:])
+        return merged
+
+    def positions(self, mountains: list[Mountain]) -> list[int]:
+        '''
+        Returns the current position of each mountain in the organiser.
+        With NumPy, all of the mountains are located in one vectorised searchsorted call
+        on the keys, which covers mountains sharing a length as well.
+
+        :raises KeyError: when a mountain is not in the organiser.
+        Time Complexity: O(m log n) where m is the number of mountains looked up
+        '''
+        mountains = list(mountains)
+        if not mountains:
+            return []
+        if any(mountain.name not in self.name_ids for mountain in mountains):
+            raise KeyError("Mountain not found")
+        keys = self._keys(mountains)
+        if any(not -self.MAX_KEY <= key <= self.MAX_KEY for key in keys):
+            raise KeyError("Mountain not found")
+        if np is not None:
+            keys = np.array(keys, dtype=np.int64)
+            found = np.searchsorted(self.keys, keys, side="left")
+            if np.any(found == len(self.keys)) or np.any(self.keys[found] != keys):
+                raise KeyError("Mountain not found")
+            return found.tolist()
+        result = [bisect.bisect_left(self.keys, key) for key in keys]
+        for pos, key in zip(result, keys):
+            if pos == len(self.keys) or self.keys[pos] != key:
+                raise KeyError("Mountain not found")
+        return result
+
+    def cur_position(self, mountain: Mountain) -> int:
+        '''
+        Returns the current position of the mountain in the organiser
+
+        :raises KeyError: when the mountain is not in the organiser.
+        Time Complexity: O(log n)
+        '''
+        return self.positions([mountain])[0]
+
+    def select(self, k: int) -> Mountain:
+        '''
+        Returns the mountain at position k.
+
+        :raises IndexError: when k is negative or not less than the number of mountains.
+        Time Complexity: O(1)
+        '''
+        if not 0 <= k < len(self):
+            raise IndexError("Position out of range")
+        return self.registry[self.handles[k]]
+
+    def memory_bytes(self) -> int:
+        '''
+        Returns the number of bytes used by the columns, not counting the mountains or names.
+        Time Complexity: O(1)
+        '''
+        return sum(column.itemsize * len(column) for column in (self.keys, self.handles))
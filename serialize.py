@@ -1,4 +1,4 @@
-import dataclasses, json
+import dataclasses, gzip, io, json, lzma, os, zlib
 
 from trail import Trail, TrailSplit, TrailSeries
 from mountain import Mountain
@@ -41,3 +41,85 @@ def deserialize(obj):
             deserialize(obj["store"]["path_follow"])
         )
     return Trail(inside)
+
+
+class ZlibStream(io.RawIOBase):
+    """
+    Raw binary stream (de)compressing zlib data incrementally,
+    so that neither side of the codec is ever held in memory in full.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, path, mode="rb") -> None:
+        self.file = open(path, mode)
+        self.reading = "r" in mode
+        self.codec = zlib.decompressobj() if self.reading else zlib.compressobj()
+        self.leftover = b""
+
+    def readable(self) -> bool:
+        return self.reading
+
+    def writable(self) -> bool:
+        return not self.reading
+
+    def readinto(self, buffer) -> int:
+        while not self.leftover:
+            chunk = self.file.read(self.CHUNK_SIZE)
+            if not chunk:
+                self.leftover = self.codec.flush()
+                break
+            self.leftover = self.codec.decompress(chunk)
+        n = min(len(buffer), len(self.leftover))
+        buffer[:n] = self.leftover[:n]
+        self.leftover = self.leftover[n:]
+        return n
+
+    def write(self, data) -> int:
+        self.file.write(self.codec.compress(bytes(data)))
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if not self.reading:
+            self.file.write(self.codec.flush())
+        self.file.close()
+        super().close()
+
+
+def _open_zlib(path, mode):
+    raw = ZlibStream(path, mode)
+    return io.BufferedReader(raw) if raw.reading else io.BufferedWriter(raw)
+
+# Compression codec for each store file extension. Anything else is plain JSON.
+CODECS = {
+    ".gz": gzip.open,
+    ".xz": lzma.open,
+    ".lzma": lzma.open,
+    ".zz": _open_zlib,
+    ".zlib": _open_zlib,
+}
+
+def open_store(path, mode="r"):
+    """
+    Open a store file in text mode, (de)compressing on the fly according to its extension.
+    """
+    codec = CODECS.get(os.path.splitext(path)[1])
+    if codec is None:
+        return open(path, mode)
+    return io.TextIOWrapper(codec(path, mode + "b"), encoding="utf-8")
+
+def write_store(trail, path):
+    """
+    Serialize trail into the store at path, streaming through its codec.
+    """
+    with open_store(path, "w") as f:
+        json.dump(trail, f, cls=EnhancedJSONEncoder)
+
+def read_store(path):
+    """
+    Deserialize the trail stored at path, streaming through its codec.
+    """
+    with open_store(path, "r") as f:
+        return deserialize(json.load(f))
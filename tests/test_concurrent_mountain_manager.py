@@ -0,0 +1,47 @@
+import threading
+import unittest
+from ed_utils.decorators import number
+
+from mountain import Mountain
+from concurrent_mountain_manager import ConcurrentMountainManager
+
+class TestConcurrentMountainManager(unittest.TestCase):
+
+    @number("5.7")
+    def test_concurrent(self):
+        cm = ConcurrentMountainManager(shards=4)
+        kept = [Mountain(f"k{i}", i % 10, i) for i in range(100)]
+        cm.add_mountains(kept)
+        errors = []
+
+        def writer(t):
+            mountains = [Mountain(f"w{t}-{i}", i % 13, i) for i in range(200)]
+            for mountain in mountains:
+                cm.add_mountain(mountain)
+            for mountain in mountains:
+                cm.remove_mountain(mountain)
+
+        def reader():
+            for _ in range(50):
+                groups = cm.group_by_difficulty()
+                difficulties = [group[0].difficulty_level for group in groups]
+                if difficulties != sorted(difficulties):
+                    errors.append(difficulties)
+
+        threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        groups = cm.group_by_difficulty()
+        self.assertEqual([len(group) for group in groups], [10] * 10)
+        self.assertEqual(len(cm.mountains_between(2, 4)), 30)
+
+        old = Mountain(kept[0].name, kept[0].difficulty_level, kept[0].length)
+        kept[0].difficulty_level = 11
+        cm.edit_mountain(old, kept[0])
+        self.assertEqual([id(m) for m in cm.mountains_with_difficulty(11)], [id(kept[0])])
+        self.assertEqual(len(cm.mountains_with_difficulty(0)), 9)
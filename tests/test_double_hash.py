@@ -1,7 +1,10 @@
 import unittest
+from unittest import mock
 from ed_utils.decorators import number
 
 from double_key_table import DoubleKeyTable
+from data_structures.hash_table import LinearProbeTable, FullError
+from data_structures.parallel_hash_table import ParallelProbeTable, np
 
 class TestDoubleHash(unittest.TestCase):
 
@@ -123,3 +126,234 @@ class TestDoubleHash(unittest.TestCase):
         # with an iterator.
         self.assertRaises(BaseException, lambda: next(key_iterator))
         self.assertRaises(BaseException, lambda: next(value_iterator))
+
+    @number("3.6")
+    def test_iter_items(self):
+        dt = DoubleKeyTable()
+        pairs = {("May", "Jim"): 1, ("Kim", "Tim"): 2, ("May", "Ben"): 3, ("Ivy", "Jen"): 4}
+        for key, value in pairs.items():
+            dt[key] = value
+
+        self.assertEqual({(k1, k2): v for k1, k2, v in dt.iter_items()}, pairs)
+        self.assertEqual(set(dt.iter_items("May")), {("May", "Jim", 1), ("May", "Ben", 3)})
+        self.assertEqual(list(dt.iter_keys()), dt.keys())
+        self.assertEqual(list(dt.iter_keys("May")), dt.keys("May"))
+        self.assertEqual(list(dt.iter_values()), dt.values())
+        self.assertRaises(KeyError, lambda: dt.iter_items("Tom"))
+
+        # Overwriting a value is not a change to the table's shape.
+        items = dt.iter_items()
+        next(items)
+        dt["May", "Jim"] = 5
+        next(items)
+
+        # Adding a pair is, and the iterator fails fast.
+        dt["Tom", "Bob"] = 6
+        self.assertRaises(RuntimeError, lambda: next(items))
+
+    @number("3.7")
+    def test_cached_hashes(self):
+        class CountingTable(LinearProbeTable):
+            calls = 0
+            def hash_full(self, key):
+                CountingTable.calls += 1
+                return super().hash_full(key)
+
+        table = CountingTable()
+        names = [f"name{i}" for i in range(100)]
+        table.update((name, i) for i, name in enumerate(names))
+        self.assertEqual(CountingTable.calls, 100) # Resizing reused the stored hashes.
+        self.assertEqual(table.hash_many(names[:3]), [table.hash_full(name) for name in names[:3]])
+        for i, name in enumerate(names):
+            self.assertEqual(table[name], i)
+            self.assertEqual(table.hashes[table._linear_probe(name, False)], table.hash_full(name))
+        del table["name7"]
+        self.assertNotIn("name7", table)
+        self.assertEqual(len(table), 99)
+
+        # Top-level resizes keep every key, even when they collide.
+        dt = DoubleKeyTable()
+        for i in range(1000):
+            dt[f"k{i % 300}", f"v{i}"] = i
+        self.assertEqual(len(list(dt.iter_items())), 1000)
+        self.assertEqual(dt[f"k{999 % 300}", "v999"], 999)
+
+    @number("3.8")
+    def test_update(self):
+        pairs = {(f"k{i % 200}", f"v{i}"): i for i in range(20000)}
+        with mock.patch.object(DoubleKeyTable, "_rehash", autospec=True) as top_rehash, \
+                mock.patch.object(LinearProbeTable, "_rehash", autospec=True) as bottom_rehash:
+            dt = DoubleKeyTable(size_hint=200)
+            dt.update(pairs)
+            self.assertEqual(top_rehash.call_count, 0)
+            self.assertEqual(bottom_rehash.call_count, 0)
+        self.assertEqual({(k1, k2): v for k1, k2, v in dt.iter_items()}, pairs)
+        self.assertEqual(len(dt), 200)
+
+        # Growing existing keys resizes each table at most once.
+        dt.update(((f"k{i % 300}", f"w{i}"), -i) for i in range(3000))
+        self.assertEqual(len(dt), 300)
+        self.assertEqual(dt["k299", "w2999"], -2999)
+        self.assertEqual(dt["k0", "v0"], 0)
+        self.assertEqual(len(dt.keys("k0")), 110)
+
+    @number("3.9")
+    def test_parallel_table(self):
+        tables = [LinearProbeTable(), ParallelProbeTable()]
+        if np is not None:
+            tables.append(ParallelProbeTable(numpy_hashes=True))
+        for table in tables:
+            for i in range(300):
+                table[f"k{i}"] = i
+            for i in range(0, 300, 3):
+                del table[f"k{i}"]
+            table["k1"] = "one"
+            table.update((f"n{i}", i) for i in range(50))
+        expected = sorted(tables[0].iter_items(), key=str)
+        for table in tables[1:]:
+            self.assertEqual(sorted(table.iter_items(), key=str), expected)
+            self.assertEqual(len(table), len(tables[0]))
+            self.assertEqual(table["k1"], "one")
+            self.assertNotIn("k3", table)
+            self.assertRaises(KeyError, lambda: table["k3"])
+
+        # As the internal tables of a DoubleKeyTable, with a replaced hash2.
+        dt = DoubleKeyTable(sizes=[12], internal_sizes=[5], sub_table_class=ParallelProbeTable)
+        dt.hash1 = lambda k: ord(k[0]) % 12
+        dt.hash2 = lambda k, sub_table: ord(k[-1]) % 5
+        dt["May", "Ben"] = 3
+        dt["May", "Tom"] = 5
+        self.assertEqual(dt._linear_probe("May", "Jim", True), (5, 1))
+        dt["May", "Jim"] = 7
+        self.assertEqual(set(dt.iter_items("May")), {("May", "Ben", 3), ("May", "Tom", 5), ("May", "Jim", 7)})
+
+    @number("3.10")
+    def test_probing(self):
+        for probing in LinearProbeTable.PROBING:
+            table = LinearProbeTable(probing=probing)
+            expected = {}
+            for i in range(400):
+                table[f"k{i}"] = i
+                expected[f"k{i}"] = i
+            for i in range(0, 400, 3):
+                del table[f"k{i}"]
+                del expected[f"k{i}"]
+            for i in range(0, 400, 6):
+                table[f"k{i}"] = -i
+                expected[f"k{i}"] = -i
+            self.assertEqual(dict(table.iter_items()), expected, probing)
+            self.assertEqual(len(table), len(expected))
+            self.assertNotIn("k3", table)
+
+            stats = table.probe_stats()
+            self.assertEqual(stats["probing"], probing)
+            self.assertEqual(stats["entries"], len(expected))
+            self.assertGreaterEqual(stats["mean_probe_length"], 1)
+            self.assertGreaterEqual(stats["max_probe_length"], stats["mean_probe_length"])
+            used = sum(size * count for size, count in stats["cluster_sizes"].items())
+            self.assertEqual(used, len(expected) + stats["tombstones"])
+
+        self.assertRaises(ValueError, lambda: LinearProbeTable(probing="cuckoo"))
+        dt = DoubleKeyTable(probing="double")
+        dt.update({(f"a{i % 10}", f"b{i}"): i for i in range(500)})
+        del dt["a0", "b0"]
+        self.assertNotIn(("a0", "b0"), dt)
+        self.assertEqual(dt["a1", "b1"], 1)
+        stats = dt.probe_stats()
+        self.assertEqual(stats["top"]["entries"], 10)
+        self.assertEqual(stats["bottom"]["entries"], 499)
+        self.assertEqual(stats["bottom"]["tombstones"], 1)
+
+        # Quadratic probing and double hashing need prime sizes to reach enough slots.
+        for probing in ("quadratic", "double"):
+            for sizes in ([16, 32, 64, 128], [12, 24], [10, 20]):
+                self.assertRaises(ValueError, lambda: LinearProbeTable(sizes=sizes, probing=probing))
+            self.assertRaises(ValueError, lambda: DoubleKeyTable(internal_sizes=[16, 32], probing=probing))
+        for probing in LinearProbeTable.PROBING:
+            sizes = [16, 32, 64, 128] if probing in ("linear", "robin_hood") else [7, 17, 37, 79, 163]
+            table = LinearProbeTable(sizes=sizes, probing=probing)
+            for i in range(60):
+                table[f"k{i}"] = i
+            self.assertEqual([table[f"k{i}"] for i in range(60)], list(range(60)))
+
+    @number("3.11")
+    def test_delete_shift_and_shrink(self):
+        table = LinearProbeTable(sizes=[13])
+        table.hash = lambda k: ord(k[0]) % 13
+        # "a" and "n" hash to 6 and "b" to 7, so they all share a cluster.
+        for key in ["a1", "n1", "a2", "b1"]:
+            table[key] = key
+        self.assertEqual([table._linear_probe(k, False) for k in ["a1", "n1", "a2", "b1"]], [6, 7, 8, 9])
+        del table["a1"]
+        # n1 and a2 shift back into the gap, and b1 moves back to where it can be found.
+        self.assertEqual([table._linear_probe(k, False) for k in ["n1", "a2", "b1"]], [6, 7, 8])
+        self.assertEqual(table.values(), ["n1", "a2", "b1"])
+
+        for make in (LinearProbeTable, ParallelProbeTable):
+            table = make()
+            for i in range(1000):
+                table[f"k{i}"] = i
+            grown = table.table_size
+            for i in range(990):
+                del table[f"k{i}"]
+            self.assertLess(table.table_size, grown)
+            self.assertLessEqual(len(table), table.table_size / 4)
+            self.assertEqual(sorted(table.values()), list(range(990, 1000)))
+
+
+    @number("3.12")
+    def test_bulk_rehash(self):
+        makers = [lambda p=p: LinearProbeTable(probing=p) for p in LinearProbeTable.PROBING] + [ParallelProbeTable]
+        for make in makers:
+            table = make()
+            for i in range(400):
+                table[f"k{i}"] = i
+            size = table.table_size
+            # A resize places entries from their stored hashes, without rehashing or reinserting keys.
+            with mock.patch.object(table, "hash_full", side_effect=AssertionError), \
+                    mock.patch.object(table, "_set", side_effect=AssertionError):
+                table._rehash()
+            self.assertGreater(table.table_size, size)
+            self.assertEqual(len(table), 400)
+            self.assertEqual([table[f"k{i}"] for i in range(400)], list(range(400)))
+
+        for probing in ("quadratic", "double"):
+            table = LinearProbeTable(probing=probing)
+            for i in range(400):
+                table[f"k{i}"] = i
+            for i in range(0, 400, 3):
+                del table[f"k{i}"]
+            self.assertGreater(table.tombstones, 0)
+            table._rehash()
+            self.assertEqual(table.tombstones, 0)
+            for i in range(400):
+                if i % 3 == 0:
+                    self.assertNotIn(f"k{i}", table)
+                    self.assertRaises(KeyError, lambda: table[f"k{i}"])
+                else:
+                    self.assertEqual(table[f"k{i}"], i)
+            self.assertEqual(len(table), 400 - len(range(0, 400, 3)))
+
+        # With custom sizes, resizes still place every entry, and a probe sequence that
+        # can't reach a free slot raises FullError instead of looping forever.
+        for probing in ("quadratic", "double"):
+            table = LinearProbeTable(sizes=[7, 17, 37, 79], probing=probing)
+            for i in range(30):
+                table[f"k{i}"] = i
+            self.assertEqual(table.table_size, 79)
+            self.assertEqual([table[f"k{i}"] for i in range(30)], list(range(30)))
+        table = LinearProbeTable(sizes=[7, 13], probing="quadratic")
+        table.hash = lambda k: 0
+        for i in range(6):
+            table[f"k{i}"] = i
+        # Probing 0, 1, 4, 9, ... from slot 0 only reaches slots 0, 1, 2 and 4 of 7.
+        self.assertRaises(FullError, lambda: table._rebuild(0))
+        self.assertEqual(table.table_size, 13)
+        self.assertEqual([table[f"k{i}"] for i in range(6)], list(range(6)))
+
+        dt = DoubleKeyTable()
+        for i in range(100):
+            dt[f"a{i}", "b"] = i
+        with mock.patch.object(dt, "hash_full", side_effect=AssertionError):
+            dt._rehash()
+        self.assertEqual([dt[f"a{i}", "b"] for i in range(100)], list(range(100)))
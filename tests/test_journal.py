@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from mountain import Mountain
+from trail import Trail, TrailSeries, TrailSplit
+from journal import TrailJournal
+from serialize import serialize
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "store.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    @number("8.1")
+    def test_replay(self):
+        a, b, c = Mountain("a", 1, 2), Mountain("b", 3, 4), Mountain("c", 5, 6)
+        trail = Trail(TrailSeries(a, Trail(None)))
+
+        journal = TrailJournal(self.path)
+        journal.compact(trail)
+
+        # Apply edits the same way the GUI does, recording each one.
+        trail.store = trail.store.add_mountain_after(b)
+        journal.record((), "add_mountain_after", b)
+        trail.store.following.store = trail.store.following.store.add_empty_branch_after()
+        journal.record(("following",), "add_empty_branch_after")
+        split = trail.store.following.store.following.store
+        split.path_top = split.path_top.add_mountain_before(c)
+        journal.record(("following", "following", "path_top"), "add_mountain_before", c)
+        a.length = 10
+        journal.record((), "edit_mountain", a)
+        journal.save(trail)
+
+        with open(self.path) as f:
+            snapshot = f.read()
+        self.assertNotIn('"b"', snapshot)
+        self.assertTrue(os.path.exists(self.path + TrailJournal.JOURNAL_SUFFIX))
+
+        loaded = TrailJournal(self.path).load()
+        self.assertEqual(serialize(loaded), serialize(trail))
+        self.assertIsInstance(loaded.store.following.store.following.store, TrailSplit)
+
+    @number("8.2")
+    def test_compact(self):
+        a, b = Mountain("a", 1, 2), Mountain("b", 3, 4)
+        trail = Trail(TrailSeries(a, Trail(TrailSeries(b, Trail(None)))))
+
+        journal = TrailJournal(self.path)
+        journal.COMPACT_THRESHOLD = 1
+        journal.compact(trail)
+        trail.store = trail.store.remove_mountain()
+        journal.record((), "remove_mountain")
+        journal.save(trail)
+
+        # Reaching the threshold folds the journal into the snapshot.
+        self.assertFalse(os.path.exists(self.path + TrailJournal.JOURNAL_SUFFIX))
+        loaded = TrailJournal(self.path).load()
+        self.assertEqual(loaded.collect_all_mountains(), [b])
+
+    @number("8.3")
+    def test_partial_record(self):
+        a, b, c = Mountain("a", 1, 2), Mountain("b", 3, 4), Mountain("c", 5, 6)
+        trail = Trail(TrailSeries(a, Trail(None)))
+        journal = TrailJournal(self.path)
+        journal.compact(trail)
+        trail.store = trail.store.add_mountain_after(b)
+        journal.record((), "add_mountain_after", b)
+        journal.save(trail)
+
+        # A crash while appending leaves the last record cut short.
+        with open(journal.journal_path, "a") as f:
+            f.write('{"path": [], "op": "add_mount')
+
+        journal = TrailJournal(self.path)
+        loaded = journal.load()
+        self.assertEqual(serialize(loaded), serialize(trail))
+        self.assertEqual(journal.journal_length, 1)
+
+        # The partial record is gone, so later records are appended cleanly.
+        loaded.store = loaded.store.add_mountain_before(c)
+        journal.record((), "add_mountain_before", c)
+        journal.save(loaded)
+        self.assertEqual(serialize(TrailJournal(self.path).load()), serialize(loaded))
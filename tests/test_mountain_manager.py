@@ -2,7 +2,7 @@ import unittest
 from ed_utils.decorators import number
 
 from mountain import Mountain
-from mountain_manager import MountainManager
+from mountain_manager import MountainManager, GroupView
 
 class TestInfiniteHash(unittest.TestCase):
 
@@ -56,3 +56,177 @@ class TestInfiniteHash(unittest.TestCase):
         self.assertEqual(len(res), 4)
 
         self.assertEqual(make_set(res[3]), make_set([m10]))
+
+    @number("5.2")
+    def test_resize(self):
+        mountains = [Mountain(f"m{i}", (i * 7) % 50 - 5, i) for i in range(200)]
+
+        mm = MountainManager()
+        for mountain in mountains:
+            mm.add_mountain(mountain)
+        self.assertGreater(mm.size, 50)
+        self.assertLessEqual(mm.count, mm.size * mm.MAX_LOAD)
+
+        res = mm.group_by_difficulty()
+        self.assertEqual(len(res), 50)
+        self.assertEqual([group[0].difficulty_level for group in res], list(range(-5, 45)))
+        self.assertEqual(sum(len(group) for group in res), 200)
+
+        for mountain in mountains[:190]:
+            mm.remove_mountain(mountain)
+        # The table shrinks again, and the remaining mountains are still reachable.
+        self.assertLess(mm.size, 50)
+        for mountain in mountains[190:]:
+            self.assertIn(id(mountain), set(id(x) for x in mm.mountains_with_difficulty(mountain.difficulty_level)))
+        self.assertEqual(len(mm.group_by_difficulty()), 10)
+
+    @number("5.3")
+    def test_range_queries(self):
+        mountains = [Mountain(f"m{i}", i % 12, i) for i in range(36)]
+        mm = MountainManager()
+        for mountain in mountains:
+            mm.add_mountain(mountain)
+
+        self.assertEqual(mm.easiest_difficulties(3), [0, 1, 2])
+        self.assertEqual(mm.mountains_with_difficulty(20), [])
+        self.assertEqual(set(id(m) for m in mm.mountains_with_difficulty(5)), set(id(m) for m in mountains[5::12]))
+        between = mm.mountains_between(3, 5)
+        self.assertEqual(len(between), 9)
+        self.assertEqual([m.difficulty_level for m in between], sorted(m.difficulty_level for m in between))
+        self.assertEqual(mm.mountains_between(13, 20), [])
+
+        for mountain in mountains[4::12]:
+            mm.remove_mountain(mountain)
+        self.assertEqual(mm.easiest_difficulties(5), [0, 1, 2, 3, 5])
+        self.assertEqual(len(mm.mountains_between(3, 5)), 6)
+
+    @number("5.4")
+    def test_identity_removal(self):
+        m1 = Mountain("same", 3, 3)
+        m2 = Mountain("same", 3, 3)
+        m3 = Mountain("other", 3, 4)
+        mm = MountainManager()
+        for mountain in [m1, m2, m3]:
+            mm.add_mountain(mountain)
+
+        # Removes the exact object, not the first equal one.
+        mm.remove_mountain(m2)
+        self.assertEqual(set(id(m) for m in mm.mountains_with_difficulty(3)), {id(m1), id(m3)})
+
+        # Editing in place, as the GUI does, moves the mountain to its new bucket.
+        old = Mountain(m3.name, m3.difficulty_level, m3.length)
+        m3.difficulty_level = 8
+        mm.edit_mountain(old, m3)
+        self.assertEqual(set(id(m) for m in mm.mountains_with_difficulty(3)), {id(m1)})
+        self.assertEqual(set(id(m) for m in mm.mountains_with_difficulty(8)), {id(m3)})
+
+        # An equal copy still removes the stored mountain.
+        mm.remove_mountain(Mountain("same", 3, 3))
+        self.assertEqual(mm.mountains_with_difficulty(3), [])
+        self.assertEqual(mm.easiest_difficulties(5), [8])
+
+        # A stored mountain without a handle is still removed by equality.
+        del mm.handles[id(m3)]
+        mm.remove_mountain(Mountain(m3.name, 8, m3.length))
+        self.assertEqual(mm.easiest_difficulties(5), [])
+
+    @number("5.5")
+    def test_add_mountains(self):
+        mountains = [Mountain(f"m{i}", (i * 13) % 100, i) for i in range(1000)]
+        mm = MountainManager()
+        mm.add_mountain(mountains[0])
+        mm.add_mountains(mountains[1:])
+
+        self.assertLessEqual(mm.count, mm.size * mm.MAX_LOAD)
+        self.assertEqual(mm.easiest_difficulties(100), list(range(100)))
+        res = mm.group_by_difficulty()
+        self.assertEqual([len(group) for group in res], [10] * 100)
+        for mountain in mountains[::7]:
+            mm.remove_mountain(mountain)
+        self.assertEqual(sum(len(group) for group in mm.group_by_difficulty()), 1000 - len(mountains[::7]))
+
+    @number("5.6")
+    def test_secondary_indexes(self):
+        m1 = Mountain("m1", 2, 5)
+        m2 = Mountain("m2", 3, 1)
+        m3 = Mountain("m3", 3, 9)
+        m4 = Mountain("m1", 4, 5)
+        mm = MountainManager(index_name=True, index_length=True)
+        mm.add_mountain(m1)
+        mm.add_mountains([m2, m3, m4])
+
+        self.assertEqual(set(id(m) for m in mm.mountains_named("m1")), {id(m1), id(m4)})
+        self.assertEqual(mm.mountains_named("m5"), [])
+        self.assertEqual(set(id(m) for m in mm.mountains_with_length_between(2, 5)), {id(m1), id(m4)})
+        self.assertEqual([m.length for m in mm.mountains_with_length_between(0, 100)], [1, 5, 5, 9])
+
+        old = Mountain(m3.name, m3.difficulty_level, m3.length)
+        m3.name, m3.length = "m6", 3
+        mm.edit_mountain(old, m3)
+        mm.remove_mountain(m4)
+        self.assertEqual(mm.mountains_named("m3"), [])
+        self.assertEqual([id(m) for m in mm.mountains_named("m6")], [id(m3)])
+        self.assertEqual([id(m) for m in mm.mountains_with_length_between(2, 5)], [id(m3), id(m1)])
+        self.assertEqual(set(mm.index_memory()), {"name", "length", "indexed_as"})
+
+        self.assertRaises(ValueError, lambda: MountainManager().mountains_named("m1"))
+
+        # A bulk load merges its lengths into the index at once.
+        many = [Mountain(f"n{i}", i % 5, (i * 37) % 1500) for i in range(3000)]
+        mm.add_mountains(many)
+        self.assertEqual([m.length for m in mm.mountains_with_length_between(10, 20)], [10, 10, 11, 11, 12, 12, 13, 13, 14, 14, 15, 15, 16, 16, 17, 17, 18, 18, 19, 19, 20, 20])
+        for mountain in many[::2]:
+            mm.remove_mountain(mountain)
+        self.assertEqual(len(mm.mountains_with_length_between(0, 1500)), 1500 + 3)
+
+    @number("5.8")
+    def test_snapshot(self):
+        mountains = [Mountain(f"m{i}", i % 4, i) for i in range(12)]
+        mm = MountainManager()
+        mm.add_mountains(mountains)
+
+        snap = mm.snapshot()
+        before = [[id(m) for m in group] for group in snap.group_by_difficulty()]
+        # Buckets are shared until they are mutated.
+        self.assertIs(snap.values[snap._probe(1)], mm.values[mm._probe(1)])
+
+        mm.remove_mountain(mountains[1])
+        mm.add_mountain(Mountain("new", 2, 0))
+        mm.add_mountain(Mountain("newer", 9, 0))
+        mm.add_mountains([Mountain("newest", 3, 0)])
+
+        self.assertEqual([[id(m) for m in group] for group in snap.group_by_difficulty()], before)
+        self.assertEqual(snap.easiest_difficulties(10), [0, 1, 2, 3])
+        self.assertEqual(len(snap.mountains_with_difficulty(1)), 3)
+        self.assertEqual(len(mm.mountains_with_difficulty(1)), 2)
+        self.assertEqual(len(mm.mountains_with_difficulty(2)), 4)
+        self.assertIs(snap.values[snap._probe(0)], mm.values[mm._probe(0)])
+        self.assertRaises(TypeError, lambda: snap.add_mountain(mountains[0]))
+
+    @number("5.9")
+    def test_group_views(self):
+        mountains = [Mountain(f"m{i}", (i * 5) % 7, i) for i in range(21)]
+        mm = MountainManager()
+        mm.add_mountains(mountains)
+
+        views = mm.group_views()
+        self.assertEqual([view.difficulty for view in views], list(range(7)))
+        self.assertEqual([len(view) for view in views], [3] * 7)
+        self.assertTrue(all(view.ordered is views[0].ordered for view in views))
+        self.assertEqual(views[2][-1].difficulty_level, 2)
+        self.assertRaises(IndexError, lambda: views[2][3])
+        self.assertEqual(
+            [[id(m) for m in view] for view in views],
+            [[id(m) for m in group] for group in mm.group_by_difficulty()],
+        )
+
+        stream = mm.iter_groups()
+        self.assertEqual(next(stream)[0].difficulty_level, 0)
+        self.assertEqual(next(stream)[0].difficulty_level, 1)
+
+        # Groups are read-only, so they can't be used to change the buckets.
+        group = next(stream)
+        self.assertIsInstance(group, GroupView)
+        with self.assertRaises(TypeError):
+            group[0] = mountains[0]
+        self.assertFalse(hasattr(group, "append"))
@@ -1,8 +1,11 @@
 import unittest
+from array import array
+from unittest import mock
 from ed_utils.decorators import number
 
 from mountain import Mountain
-from mountain_organiser import MountainOrganiser
+import mountain_organiser
+from mountain_organiser import MountainOrganiser, FenwickOrganiser, ColumnarOrganiser, np
 
 class TestInfiniteHash(unittest.TestCase):
 
@@ -31,3 +34,145 @@ class TestInfiniteHash(unittest.TestCase):
         self.assertEqual([mo.cur_position(m) for m in [m1, m2, m3, m4, m5, m6, m7, m8, m9]], [1, 8, 3, 0, 4, 2, 6, 7, 5])
 
         self.assertRaises(KeyError, lambda: mo.cur_position(m10))
+
+    @number("6.2")
+    def test_many_blocks(self):
+        mountains = [Mountain(f"m{i}", 1, (i * 7919) % 3000) for i in range(3000)]
+        mo = MountainOrganiser()
+        for i in range(0, 3000, 250):
+            mo.add_mountains(mountains[i:i + 250])
+
+        expected = sorted((m.length, m.name) for m in mountains)
+        self.assertGreater(len(mo.mountains.blocks), 1)
+        self.assertEqual(list(mo.mountains), expected)
+        for mountain in mountains[::37]:
+            self.assertEqual(mo.cur_position(mountain), expected.index((mountain.length, mountain.name)))
+
+    @number("6.3")
+    def test_batch_merge(self):
+        mountains = [Mountain(f"m{i}", 1, (i * 31) % 500) for i in range(2000)]
+        mo = MountainOrganiser()
+        # A large group is merged in one pass, a small one inserted item by item.
+        mo.add_mountains(mountains[:1500])
+        mo.add_mountains(mountains[1500:1550])
+        mo.add_mountains(mountains[1550:])
+        expected = sorted((m.length, m.name) for m in mountains)
+        self.assertEqual(list(mo.mountains), expected)
+        self.assertEqual(mo.cur_position(mountains[1520]), expected.index((mountains[1520].length, mountains[1520].name)))
+
+    @number("6.4")
+    def test_rank_history(self):
+        groups = [
+            [Mountain(f"g{g}m{i}", g, (g * 7 + i * 13) % 20) for i in range(g + 1)]
+            for g in range(6)
+        ]
+        groups[3].append(Mountain("g1m0", 3, groups[1][0].length))
+
+        # Compare against recording cur_position after each group by hand.
+        mo = MountainOrganiser()
+        expected = []
+        for i, group in enumerate(groups):
+            mo.add_mountains(group)
+            expected.extend((mountain, i, []) for mountain in group)
+            for mountain, _, positions in expected:
+                positions.append(mo.cur_position(mountain))
+
+        histories = FenwickOrganiser.rank_history(groups)
+        self.assertEqual(
+            [(id(m), start, positions) for m, start, positions in histories],
+            [(id(m), start, positions) for m, start, positions in expected],
+        )
+
+        fo = FenwickOrganiser([m for group in groups for m in group])
+        fo.add_mountains(groups[0])
+        self.assertEqual(fo.cur_position(groups[0][0]), 0)
+        self.assertRaises(KeyError, lambda: fo.cur_position(groups[1][0]))
+        fo.add_mountains(groups[3])
+        self.assertEqual(fo.current_positions(), [fo.cur_position(m) for m in groups[0] + groups[3]])
+
+
+    @number("6.5")
+    def test_order_statistics(self):
+        mountains = [Mountain(f"m{i:02}", 1, (i * 7) % 10) for i in range(30)]
+        mo = MountainOrganiser()
+        mo.add_mountains(mountains)
+        ordered = sorted(mountains, key=lambda m: (m.length, m.name))
+
+        self.assertEqual([id(mo.select(k)) for k in range(30)], [id(m) for m in ordered])
+        self.assertRaises(IndexError, lambda: mo.select(30))
+        self.assertRaises(IndexError, lambda: mo.select(-1))
+        self.assertEqual(mo.count_range(2, 4), 9)
+        self.assertEqual(mo.count_range(0, 9), 30)
+        self.assertEqual(mo.count_range(10, 20), 0)
+
+        mo.remove(ordered[0])
+        self.assertIs(mo.select(0), ordered[1])
+        self.assertRaises(KeyError, lambda: mo.remove(ordered[0]))
+
+        old = Mountain(ordered[5].name, ordered[5].difficulty_level, ordered[5].length)
+        ordered[5].length = 100
+        mo.update(old, ordered[5])
+        self.assertIs(mo.select(28), ordered[5])
+        self.assertEqual(mo.cur_position(ordered[5]), 28)
+        self.assertEqual(mo.count_range(0, 9), 28)
+
+        # A mountain edited in place onto another's key isn't removed in its place.
+        x, y = Mountain("x", 2, 50), Mountain("y", 1, 60)
+        mo.add_mountains([x, y])
+        old_x = Mountain(x.name, x.difficulty_level, x.length)
+        x.name, x.length = "y", 60
+        self.assertRaises(KeyError, lambda: mo.remove(x))
+        self.assertIs(mo.select(mo.cur_position(y)), y)
+        mo.update(old_x, x)
+        self.assertEqual(mo.count_range(50, 50), 0)
+        self.assertEqual(set(id(m) for m in mo.by_key[(60, "y")]), {id(x), id(y)})
+        # An equal copy removes the stored mountain.
+        mo.remove(Mountain("y", 1, 60))
+        self.assertEqual(len(mo.by_key[(60, "y")]), 1)
+
+    def check_columnar(self):
+        mountains = [Mountain(f"m{(i * 17) % 40}", 1, (i * 7) % 10) for i in range(40)]
+        mo = MountainOrganiser()
+        co = ColumnarOrganiser()
+        for i in range(0, 40, 10):
+            mo.add_mountains(mountains[i:i + 10])
+            co.add_mountains(mountains[i:i + 10])
+            added = mountains[:i + 10]
+            self.assertEqual(co.positions(added), [mo.cur_position(m) for m in added])
+
+        self.assertEqual([id(co.select(k)) for k in range(40)], [id(mo.select(k)) for k in range(40)])
+        self.assertRaises(IndexError, lambda: co.select(40))
+        self.assertRaises(IndexError, lambda: co.select(-1))
+        self.assertEqual(co.cur_position(mountains[3]), mo.cur_position(mountains[3]))
+        self.assertRaises(KeyError, lambda: co.positions([Mountain("m1", 1, 11)]))
+        self.assertRaises(KeyError, lambda: co.cur_position(Mountain("zz", 1, 1)))
+        self.assertEqual(co.memory_bytes(), 2 * 8 * 40)
+        self.assertRaises(OverflowError, lambda: co.add_mountains([Mountain("big", 1, 2 ** 62)]))
+        self.assertEqual(len(co), 40)
+
+    @number("6.6")
+    def test_columnar(self):
+        # The array('q') columns used when NumPy is not installed.
+        with mock.patch.object(mountain_organiser, "np", None):
+            self.check_columnar()
+            self.assertIsInstance(ColumnarOrganiser().keys, array)
+
+    @number("6.7")
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_columnar_numpy(self):
+        self.check_columnar()
+        self.assertIsInstance(ColumnarOrganiser().keys, np.ndarray)
+
+        # The NumPy columns match the array('q') ones, with many shared lengths
+        # and new names arriving in every batch.
+        mountains = [Mountain(f"m{(i * 31) % 97}", 1, (i * 7) % 5) for i in range(300)]
+        with mock.patch.object(mountain_organiser, "np", None):
+            plain = ColumnarOrganiser()
+        vectorised = ColumnarOrganiser()
+        for i in range(0, 300, 60):
+            with mock.patch.object(mountain_organiser, "np", None):
+                plain.add_mountains(mountains[i:i + 60])
+                expected = plain.positions(mountains[:i + 60])
+            vectorised.add_mountains(mountains[i:i + 60])
+            self.assertEqual(vectorised.keys.tolist(), list(plain.keys))
+            self.assertEqual(vectorised.positions(mountains[:i + 60]), expected)
@@ -0,0 +1,86 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from serialize import CODECS, open_store, read_store, serialize, write_store
+from benchmarks.trail_gen import generate_trail
+from ingest_trails import ingest, run_query
+from journal import TrailJournal
+from mountain import Mountain
+from trail import Trail, TrailSeries
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestSerialize(unittest.TestCase):
+
+    @number("9.1")
+    def test_codecs(self):
+        trail = generate_trail(200)
+        with tempfile.TemporaryDirectory() as directory:
+            plain = os.path.join(directory, "store.json")
+            write_store(trail, plain)
+            for ext in CODECS:
+                path = plain + ext
+                write_store(trail, path)
+                self.assertLess(os.path.getsize(path), os.path.getsize(plain))
+                self.assertEqual(serialize(read_store(path)), serialize(trail))
+                with open_store(path) as f:
+                    self.assertEqual(f.read(), serialize(trail))
+
+    @number("9.2")
+    def test_convert_stores(self):
+        trails = [generate_trail(50), Trail(TrailSeries(Mountain("first", 1, 1), generate_trail(80)))]
+        with tempfile.TemporaryDirectory() as directory:
+            out = os.path.join(directory, "converted")
+            for i, trail in enumerate(trails):
+                write_store(trail, os.path.join(directory, f"store{i}.json"))
+            # Edits journaled next to a store are part of it, and must survive the conversion.
+            journal = TrailJournal(os.path.join(directory, "store1.json"))
+            extra = Mountain("journaled", 3, 4)
+            trails[1].store = trails[1].store.add_mountain_before(extra)
+            journal.record((), "add_mountain_before", extra)
+            journal.save(trails[1])
+            self.assertTrue(os.path.exists(journal.journal_path))
+            done = subprocess.run(
+                [sys.executable, "convert_stores.py", directory, "--to", ".json.gz", "--out", out, "--check", "--workers", "1"],
+                cwd=REPO_ROOT, capture_output=True, text=True,
+            )
+            self.assertEqual(done.returncode, 0, done.stdout + done.stderr)
+            self.assertEqual(done.stdout.count("round-trip ok"), 2)
+            self.assertEqual(done.stdout.count("+1 journaled edits"), 1)
+            for i, trail in enumerate(trails):
+                self.assertEqual(serialize(read_store(os.path.join(out, f"store{i}.json.gz"))), serialize(trail))
+
+    @number("9.3")
+    def test_ingest_trails(self):
+        trails = [generate_trail(n) for n in (10, 30, 60)]
+        with tempfile.TemporaryDirectory() as directory:
+            infile = os.path.join(directory, "trails.jsonl")
+            outfile = os.path.join(directory, "results.jsonl")
+            with open(infile, "w") as f:
+                # Blank lines are skipped, and don't count as trails.
+                f.write("\n".join(serialize(trail) for trail in trails) + "\n\n")
+            done = subprocess.run(
+                [sys.executable, "ingest_trails.py", infile, outfile, "--query", "mountains", "--workers", "1", "--chunk-size", "2"],
+                cwd=REPO_ROOT, capture_output=True, text=True,
+            )
+            self.assertEqual(done.returncode, 0, done.stderr)
+            with open(outfile) as f:
+                results = [json.loads(line) for line in f]
+        self.assertEqual(results, [{"trail": i, "result": run_query(trail, "mountains", 1, "lazy")} for i, trail in enumerate(trails)])
+
+        # Chunk sizes, in-flight limits and worker counts below 1 are rejected up front.
+        for option in ("--chunk-size", "--in-flight", "--workers"):
+            done = subprocess.run(
+                [sys.executable, "ingest_trails.py", "-", option, "0"],
+                cwd=REPO_ROOT, capture_output=True, text=True, stdin=subprocess.DEVNULL,
+            )
+            self.assertEqual(done.returncode, 2, option)
+            self.assertIn("must be at least 1", done.stderr)
+        with io.StringIO() as out:
+            self.assertRaises(ValueError, lambda: ingest(io.StringIO(), out, "mountains", chunk_size=0))
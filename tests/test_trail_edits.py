@@ -2,7 +2,9 @@ import unittest
 from ed_utils.decorators import number
 
 from mountain import Mountain
-from trail import Trail, TrailSeries, TrailSplit, TrailStore
+from trail import Trail, TrailSeries, TrailSplit
+from trail_events import trail_changes
+from mountain_manager import MountainManager
 
 class TestTrailMethods(unittest.TestCase):
 
@@ -112,3 +114,69 @@ class TestTrailMethods(unittest.TestCase):
         self.assertIsInstance(res, TrailSeries)
         self.assertEqual(res.mountain, m)
         self.assertEqual(res.following.store, None)
+
+    @number("1.5")
+    def test_change_events(self):
+        a, b, c, d = (Mountain(letter, i, 5) for i, letter in enumerate("abcd"))
+        mm = MountainManager()
+        events = []
+        trail_changes.subscribe(mm.on_trail_change)
+        trail_changes.subscribe(events.append)
+        try:
+            t = Trail(None).add_mountain_before(a)
+            t.store = t.store.add_mountain_after(b)
+            self.assertEqual(len(events), 2)
+            split = TrailSplit(Trail(None).add_mountain_before(c), Trail(None).add_mountain_before(d), Trail(None))
+            self.assertEqual(len(mm.group_by_difficulty()), 4)
+
+            # A removed branch drops all of its mountains at once.
+            split.remove_branch()
+            self.assertEqual([id(m) for m in events[-1].removed], [id(c), id(d)])
+            self.assertEqual(mm.easiest_difficulties(4), [0, 1])
+
+            # Batched changes arrive as one event, with cancelling edits folded away.
+            count = len(events)
+            with trail_changes.batch():
+                t.store = t.store.remove_mountain()
+                series = TrailSeries(b, Trail(None)).add_mountain_before(c)
+                series.remove_mountain()
+            self.assertEqual(len(events), count + 1)
+            self.assertEqual([id(m) for m in events[-1].removed], [id(a)])
+            self.assertEqual(events[-1].added, [])
+            self.assertEqual(mm.easiest_difficulties(4), [1])
+        finally:
+            trail_changes.unsubscribe(mm.on_trail_change)
+            trail_changes.unsubscribe(events.append)
+
+    @number("1.6")
+    def test_batch_remove_then_readd(self):
+        a, b = Mountain("a", 1, 5), Mountain("b", 2, 5)
+        mm = MountainManager()
+        mm.add_mountains([a, b])
+        events = []
+        trail_changes.subscribe(mm.on_trail_change)
+        trail_changes.subscribe(events.append)
+        try:
+            series = TrailSeries(a, Trail(TrailSeries(b, Trail(None))))
+            # Removing a mountain and putting the same object back cancels out.
+            with trail_changes.batch():
+                rest = series.remove_mountain()
+                Trail(rest).add_mountain_before(a)
+            self.assertEqual(events, [])
+            self.assertEqual(mm.mountains_with_difficulty(1), [a])
+
+            # The manager still knows a, so it can be removed later.
+            mm.remove_mountain(a)
+            self.assertEqual(mm.mountains_with_difficulty(1), [])
+
+            # Removed, added back and removed again is one removal.
+            with trail_changes.batch():
+                rest = TrailSeries(b, Trail(None)).remove_mountain()
+                Trail(rest).add_mountain_before(b)
+                TrailSeries(b, Trail(None)).remove_mountain()
+            self.assertEqual([id(m) for m in events[-1].removed], [id(b)])
+            self.assertEqual(events[-1].added, [])
+            self.assertEqual(mm.mountains_with_difficulty(2), [])
+        finally:
+            trail_changes.unsubscribe(mm.on_trail_change)
+            trail_changes.unsubscribe(events.append)
@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from mountain import Mountain
 from typing import TYPE_CHECKING, Union
 from data_structures.linked_stack import LinkedStack
+from trail_events import TrailChange, trail_changes
 # Avoid circular imports for typing.
 if TYPE_CHECKING:
     from personality import WalkerPersonality
@@ -24,6 +25,9 @@ class TrailSplit:
 
     def remove_branch(self) -> TrailStore:
         """Removes the branch, should just leave the remaining following trail."""
+        if trail_changes.active:
+            removed = self.path_top.collect_all_mountains() + self.path_bottom.collect_all_mountains()
+            trail_changes.publish(TrailChange(removed=removed))
         return self.path_follow.store
         
                                                                                       
@@ -51,14 +55,14 @@ class TrailSeries:
     def remove_mountain(self) -> TrailStore:
         """Removes the mountain at the beginning of this series."""
 
-        return TrailSeries(self.mountain
-                           (self.mountain.name, 0, 0), 
-                           self.following)
+        trail_changes.publish(TrailChange(removed=[self.mountain]))
+        return self.following.store
         
 
     def add_mountain_before(self, mountain: Mountain) -> TrailStore:
         """Adds a mountain in series before the current one."""
             
+        trail_changes.publish(TrailChange(added=[mountain]))
         return TrailSeries(mountain,
                            Trail( TrailSeries
                                  (self.mountain, self.following) 
@@ -81,6 +85,7 @@ class TrailSeries:
     def add_mountain_after(self, mountain: Mountain) -> TrailStore:
         """Adds a mountain after the current mountain, but before the following trail."""
 
+        trail_changes.publish(TrailChange(added=[mountain]))
         return TrailSeries(self.mountain, 
                            Trail(TrailSeries(mountain, self.following)))
 
@@ -107,6 +112,7 @@ class Trail:
     def add_mountain_before(self, mountain: Mountain) -> Trail:
         """Adds a mountain before everything currently in the trail."""
 
+        trail_changes.publish(TrailChange(added=[mountain]))
         return Trail(TrailSeries(mountain, self))
 
 
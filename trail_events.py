@@ -0,0 +1,94 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+from mountain import Mountain
+
+@dataclass
+class TrailChange:
+    """
+    The mountains added to and removed from trails by one or more edits.
+    """
+
+    added: list[Mountain] = field(default_factory=list)
+    removed: list[Mountain] = field(default_factory=list)
+
+    def merge(self, other: TrailChange) -> None:
+        """
+        Fold a later change into this one.
+        A mountain added here and removed by other cancels out, and so does
+        a mountain removed here and added back by other.
+
+        :complexity: O(len(self.added) + len(self.removed) + len(other.added) + len(other.removed))
+        """
+        removed_ids = set(id(m) for m in other.removed)
+        readded_ids = set(id(m) for m in other.added)
+        added_ids = set(id(m) for m in self.added)
+        already_removed_ids = set(id(m) for m in self.removed)
+        self.added = [m for m in self.added if id(m) not in removed_ids]
+        self.removed = [m for m in self.removed if id(m) not in readded_ids]
+        self.added.extend(m for m in other.added if id(m) not in already_removed_ids)
+        self.removed.extend(m for m in other.removed if id(m) not in added_ids)
+
+
+class TrailChangePublisher:
+    """
+    Publishes the changes made by the trail edit methods to subscribers,
+    so that indexes over the mountains of a trail can update incrementally.
+
+    Inside a `batch()` block, changes are collected and delivered to
+    subscribers as a single TrailChange when the outermost block exits.
+
+    Changes are not tagged with the trail they came from: every subscriber
+    receives the edits made to every trail through this publisher.
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: list[Callable[[TrailChange], None]] = []
+        self.pending: TrailChange | None = None
+        self.depth = 0
+
+    def subscribe(self, callback: Callable[[TrailChange], None]) -> None:
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[TrailChange], None]) -> None:
+        self.subscribers.remove(callback)
+
+    @property
+    def active(self) -> bool:
+        """Whether anyone is listening, so that publishers can skip collecting changes."""
+        return bool(self.subscribers)
+
+    def publish(self, change: TrailChange) -> None:
+        """
+        Deliver a change to every subscriber, or hold it until the current batch ends.
+
+        :complexity: O(S) where S is the number of subscribers, outside of a batch.
+        """
+        if self.pending is not None:
+            self.pending.merge(change)
+            return
+        for callback in list(self.subscribers):
+            callback(change)
+
+    @contextmanager
+    def batch(self):
+        """Collect all changes made in this block into one event."""
+        if self.depth == 0:
+            self.pending = TrailChange()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                change, self.pending = self.pending, None
+                if change.added or change.removed:
+                    self.publish(change)
+
+
+# Changes from every trail edit method, on every trail, are published here.
+# There is one publisher for the whole program, so a subscriber such as
+# MountainManager.on_trail_change mirrors all trails edited while it is
+# subscribed, not one particular trail; unsubscribe it when switching trails.
+trail_changes = TrailChangePublisher()